@@ -1,12 +1,31 @@
 # app.py
-from flask import Flask, render_template, request, redirect, flash, url_for, jsonify
+from flask import Flask, abort, render_template, request, redirect, flash, url_for, jsonify, Response, stream_with_context, g, session
+from werkzeug.local import LocalProxy
 from config import Config
-from models.predictor import MilkPredictor
-from models.history import HistoryManager
-from utils.validator import generate_rekomendasi
-from utils.preprocessing import preprocess_data   # harus mengembalikan (df, highlight_mask, steps_log)
+from models.predictor import MilkPredictor, FITUR_COLS, MODES, MODE_GABUNGAN, MODE_PER_SAPI, _kode_key
+from models.features import FeatureStore, FITUR_WAKTU
+from models.history import HistoryManager, COLUMNS as RIWAYAT_COLUMNS, ANALISIS_COLS
+from models.analysis import AnalysisModel
+from models.dataset import DatasetStore
+from models.herd import ke_float64
+from models.registry import DatasetRegistry, registry_path, list_datasets, normalize_dataset_name
+from models.pool import DatasetPool
+from utils.validator import generate_rekomendasi, kode_rekomendasi, teks_rekomendasi
+from utils.schema import MissingColumnsError, resolve_columns
+from utils.metrics import metrics
+from utils.coalesce import SingleFlight, MicroBatcher
+from utils.export import FORMATS as EXPORT_FORMATS, stream as export_stream
+from utils.ingest import scan_file, cache_path, ingest_csv
+from models.jobs import JobQueue
 import os
-import pandas as pd
+import sys
+import json
+import time
+import platform
+import uuid
+import numpy as np
+# pandas tidak diimpor di level modul: worker yang cukup dilayani artefak (models.artifacts)
+# tidak perlu membayar waktu impornya. Diimpor di fungsi yang memang memakai DataFrame.
 from io import StringIO
 
 app = Flask(__name__)
@@ -14,130 +33,449 @@ app.config.from_object(Config)
 
 
 class MilkPredictionApp:
-    def __init__(self):
-        self.data_path = None
-        self.predictor = None
-        self.history_manager = HistoryManager()
+    """Konteks satu dataset (peternakan): dataset, predictor, index sapi, preview & partisi riwayat."""
+
+    def __init__(self, name=Config.DEFAULT_DATASET, history_manager=None):
+        self.name = name
+        # dataset dibagi antar worker lewat registry di disk + cache Arrow (mmap)
+        self.dataset = DatasetStore(registry=DatasetRegistry(registry_path(name)))
+        self.predictor = MilkPredictor(self.dataset, cache_name=f'window_coef.{name}')
+        self.artifacts = self.predictor.artifacts
+        # fitur deret waktu per sapi (lag & rata-rata bergulir), di-cache per versi dataset
+        self.features = FeatureStore(self.dataset, self.artifacts)
+        self.history_manager = history_manager or HistoryManager()
+        self.analysis_model = AnalysisModel(self.history_manager, name)
         self.sapi_info = []
+        self.sapi_index = {}
+        self._sapi_version = None
+        # (versi dataset, hasil preprocess_data) untuk /preview
+        self._preview_cache = None
+        self._flight = SingleFlight()
+        # /api/predict: request yang datang hampir bersamaan diprediksi dalam satu batch
+        self._batcher = MicroBatcher(self._predict_microbatch, Config.PREDICT_BATCH_WAIT_MS / 1000,
+                                     Config.PREDICT_BATCH_MAX, name=name)
+
+    @property
+    def data_path(self):
+        return self.dataset.path
+
+    def memory_bytes(self):
+        """Perkiraan memori konteks ini (dataset + cache preview + fitur), untuk DatasetPool."""
+        total = self.dataset.memory_bytes()
+        if self._preview_cache is not None:
+            total += int(self._preview_cache[1][0].memory_usage(deep=False).sum())
+        return total + self.features.memory_bytes()
+
+    def close(self):
+        metrics.unregister_cache(self.predictor.cache_name)
+        metrics.unregister_cache(f'{self.predictor.cache_name}.singleflight')
+        metrics.unregister_labels(batcher=self.name)
+
+    def ingest_upload(self, job, path, filename):
+        """Job upload: hash isi, parse + validasi ke cache Arrow, muat dataset, lalu pemanasan model."""
+        try:
+            job.progress(0.05, 'Menghitung hash file...')
+            version, encoding = scan_file(path)
+            tujuan = os.path.join(os.path.dirname(path), f'{version}.csv')
+            os.replace(path, tujuan)
+            path = tujuan
+            cache = cache_path(version)
+            if not os.path.exists(cache):
+                job.progress(0.2, 'Parsing & validasi kolom...')
+                jobs.run_cpu(ingest_csv, path, encoding, cache)
+            job.progress(0.6, 'Memuat dataset...')
+            self.dataset.load(path, scanned=(version, encoding))
+        except MissingColumnsError as e:
+            # tak perlu hapus file kalau mau debugging, tapi kita hapus untuk kebersihan
+            os.remove(path)
+            raise ValueError(f"File tidak valid. Kolom berikut hilang: {', '.join(sorted(e.missing))}") from e
+        except Exception as e:
+            if os.path.exists(path):
+                os.remove(path)
+            raise ValueError(f"Terjadi kesalahan saat membaca file: {e}") from e
+
+        job.progress(0.75, 'Pemanasan model...')
+        tanggal_valid = self.predictor.get_valid_dates()
+        if tanggal_valid:
+            self.predictor.precompute_coefficients()
+        job.progress(0.85, 'Melatih model per sapi...')
+        self.predictor.fit_per_sapi()
+        self.load_sapi_info()
+        job.progress(0.95, 'Menghitung fitur deret waktu...')
+        self.features.get()
+        return {'dataset': self.name, 'file': filename, 'versi': version,
+                'baris': len(self.dataset.herd), 'tanggal_valid': len(tanggal_valid)}
+
+    def batch_job(self, job, items, defaults, simpan, mode):
+        """Job batch prediksi; hasil lengkap ditulis ke JOB_RESULT_FOLDER/<id job>.json."""
+        job.progress(0.1, 'Menyiapkan data...')
+        if items is None:
+            items = self.all_batch_items()
+        job.progress(0.3, f'Memprediksi {len(items)} baris...')
+        hasil, gagal = self.predict_batch(items, defaults=defaults, simpan=simpan, mode=mode)
+        job.progress(0.9, 'Menulis hasil...')
+        os.makedirs(Config.JOB_RESULT_FOLDER, exist_ok=True)
+        with open(job_result_path(job.id), 'w', encoding='utf-8') as f:
+            json.dump(_batch_payload(hasil, gagal), f, ensure_ascii=False)
+        return {'dataset': self.name, 'jumlah': len(hasil), 'jumlah_gagal': len(gagal)}
 
-    # helper internal: normalisasi nama kolom supaya konsisten
     @staticmethod
-    def _normalize_columns(cols):
-        cols = pd.Index(cols).astype(str)
-        cols = (
-            cols.str.strip()
-                 .str.lower()
-                 .str.replace('/', '_per_', regex=False)
-                 .str.replace(r'[()\[\],%]', '', regex=True)
-                 .str.replace(r'\s+', '_', regex=True)
-                 .str.replace(r'__+', '_', regex=True)
-                 .str.strip('_')
-        )
-        return cols
+    def normalize_kode(kode):
+        return str(kode).strip().upper()
 
     def load_sapi_info(self):
-        """Load sapi info (kode sapi, umur, berat) from file, tolerant terhadap variasi nama kolom."""
-        self.sapi_info = []
-        if not self.data_path or not os.path.exists(self.data_path):
+        """
+        Index sapi {kode ternormalisasi: {kode, umur, berat}} dari dataset bersama.
+        Dibangun ulang (vektorisasi kolom, tanpa iterrows) hanya bila versi dataset berubah,
+        atau dimuat dari artefak 'index_sapi' bila worker lain sudah membangunnya.
+        """
+        if not self.dataset.exists():
+            self.sapi_index, self.sapi_info, self._sapi_version = {}, [], None
             return []
 
-        # baca file
-        try:
-            df = pd.read_csv(self.data_path)
-        except Exception:
-            # coba encoding alternatif
-            df = pd.read_csv(self.data_path, encoding='latin1')
-
-        # normalisasi kolom sementara (tanpa mengganti df.columns permanen)
-        normalized = {orig: norm for orig, norm in zip(df.columns, self._normalize_columns(df.columns))}
-        # buat map dari nama normal -> original column name untuk mengambil nilai aslinya
-        inv_map = {v: k for k, v in normalized.items()}
-
-        # mapping nama yg dibutuhkan (alias)
-        aliases = {
-            'kode_sapi': ['kode_sapi', 'kode_sapi'],
-            'umur': ['umur_(tahun)', 'umur'],
-            'berat': ['berat_badan_kg', 'berat_badan', 'berat']
+        version = self.dataset.current_version()
+        if self._sapi_version == version:
+            return self.sapi_info
+
+        art = self._flight.do(('index_sapi', version), self._load_sapi_arrays, version)
+        index = {
+            k: {'kode': str(kd), 'umur': float(u), 'berat': float(b)}
+            for k, kd, u, b in zip(art['key'].tolist(), art['kode'], art['umur'], art['berat'])
         }
 
-        # jika kolom-kolom yang diperlukan ada, isi sapi_info
-        if 'kode_sapi' not in inv_map or not ({'umur_(tahun)', 'berat_badan_kg'} & set(inv_map.keys())):
-            # kalau tidak sesuai format, kosongkan
-            self.sapi_info = []
-            return []
+        self.sapi_index = index
+        self.sapi_info = sorted(index.values(), key=lambda s: s['kode'])
+        self._sapi_version = version
+        return self.sapi_info
 
-        # # gunakan kolom original dari inv_map (fallback jika nama bervariasi)
-        # kode_col = inv_map.get('kode_sapi')
-        # # umur dapat dari kemungkinan nama umur_(tahun) atau umur
-        # umur_col = inv_map.get('umur_(tahun)') or inv_map.get('umur')
-        # berat_col = inv_map.get('berat_badan_kg') or inv_map.get('berat_badan') or inv_map.get('berat')
+    def _load_sapi_arrays(self, version):
+        art = self.artifacts.load(version, 'index_sapi')
+        if art is None:
+            art = self._build_sapi_arrays(self.dataset.herd)
+            self.artifacts.save(version, 'index_sapi', **art)
+        return art
 
-        ########################## Start Modified Area ############################
+    @staticmethod
+    def _build_sapi_arrays(herd):
+        if not {'kode_sapi', 'umur_tahun', 'berat_badan_kg'} <= set(herd.columns):
+            return {'key': np.array([], dtype=str), 'kode': np.array([], dtype=str),
+                    'umur': np.array([], dtype=float), 'berat': np.array([], dtype=float)}
+        # baris pertama tiap kode sapi (kode int32 HerdData, -1 = kosong)
+        baris = np.flatnonzero(herd.kode >= 0)
+        kategori, pertama = np.unique(herd.kode[baris], return_index=True)
+        baris = baris[pertama]
+        kode = herd.kategori[kategori]
+        return {
+            'key': np.char.upper(np.char.strip(kode)),
+            'kode': kode,
+            'umur': ke_float64(herd.ukuran['umur_tahun'][baris]),
+            'berat': ke_float64(herd.ukuran['berat_badan_kg'][baris]),
+        }
 
-        kode_col = inv_map.get('kode_sapi') or next((v for k,v in inv_map.items() if 'kode' in k), None)
-        umur_col = inv_map.get('umur_(tahun)') or inv_map.get('umur') or next((v for k,v in inv_map.items() if 'umur' in k), None)
-        berat_col = inv_map.get('berat_badan_kg') or inv_map.get('berat_badan') or inv_map.get('berat') or next((v for k,v in inv_map.items() if 'berat' in k), None)
+    def get_preprocessed(self):
+        """Hasil preprocess_data untuk /preview, di-cache per versi dataset."""
+        from utils.preprocessing import preprocess_data   # harus mengembalikan (df, highlight_mask, steps_log)
+        df = self.dataset.get()
+        if self._preview_cache is None or self._preview_cache[0] != self.dataset.version:
+            # salin frame bersama supaya preprocessing tidak mengubah dataset yang dipakai prediksi
+            self._preview_cache = (self.dataset.version, preprocess_data(df.copy()))
+        return self._preview_cache[1]
 
-        ########################## End Modified Area ############################
+    def get_kode_sapi_list(self):
+        return [s['kode'] for s in self.load_sapi_info()]
 
-        if not kode_col or not umur_col or not berat_col:
-            self.sapi_info = []
-            return []
+    def get_sapi_by_kode(self, kode_sapi):
+        self.load_sapi_info()
+        return self.sapi_index.get(self.normalize_kode(kode_sapi))
 
-        # drop duplicates by kode sapi and extract
-        try:
-            unique_rows = df.drop_duplicates(kode_col)
-        except Exception:
-            unique_rows = df
+    @staticmethod
+    def batch_items_from_records(records):
+        """Ubah list dict / DataFrame input batch menjadi DataFrame dengan nama kolom baku."""
+        import pandas as pd
+        items = pd.DataFrame(records)
+        items.columns = resolve_columns(items.columns)
+        return items
+
+    def all_batch_items(self, kode=None):
+        """Semua sapi (atau hanya `kode`) × semua tanggal valid."""
+        import pandas as pd
+        kode = self.get_kode_sapi_list() if kode is None else kode
+        tanggal = self.predictor.get_valid_dates()
+        return pd.DataFrame({
+            'kode_sapi': np.repeat(np.asarray(kode, dtype=object), len(tanggal)),
+            'tanggal_pemerahan': np.tile(np.asarray(tanggal, dtype=object), len(kode)),
+        })
 
-        result = []
-        for _, row in unique_rows.iterrows():
-            try:
-                result.append({
-                    'kode': row[kode_col],
-                    'umur': row[umur_col],
-                    'berat': row[berat_col]
-                })
-            except Exception:
+    def predict_batch(self, items, defaults=None, simpan=True, mode=MODE_GABUNGAN):
+        """
+        Prediksi banyak pasangan (kode_sapi, tanggal) sekaligus.
+
+        Umur & berat diisi dari sapi_info bila kosong; pakan & suhu dari `defaults`,
+        lalu rata-rata pakan sapi tsb / rata-rata suhu dataset. Mode 'per_sapi' memakai
+        model masing-masing sapi (tanggal cukup valid formatnya). Mengembalikan (hasil, gagal).
+        """
+        import pandas as pd
+        defaults = defaults or {}
+        herd = self.dataset.get_herd()
+        items = items.copy()
+        for c in ['kode_sapi', 'tanggal_pemerahan'] + FITUR_COLS:
+            if c not in items.columns:
+                items[c] = np.nan
+
+        kode = items['kode_sapi'].astype(str)
+        items['kode_sapi'] = kode
+        items['tanggal_pemerahan'] = pd.to_datetime(items['tanggal_pemerahan'], errors='coerce').dt.strftime('%Y-%m-%d')
+
+        self.load_sapi_info()
+        key = kode.str.strip().str.upper()
+        umur = pd.Series({k: v['umur'] for k, v in self.sapi_index.items()}, dtype=float)
+        berat = pd.Series({k: v['berat'] for k, v in self.sapi_index.items()}, dtype=float)
+        items['umur_tahun'] = pd.to_numeric(items['umur_tahun'], errors='coerce').fillna(key.map(umur))
+        items['berat_badan_kg'] = pd.to_numeric(items['berat_badan_kg'], errors='coerce').fillna(key.map(berat))
+
+        # dikunci kode ternormalisasi seperti sapi_index, jadi 'sapi01' / ' SAPI01 ' tetap ketemu
+        pakan_sapi = herd.rata_per_kode('jumlah_pakan_kg', kunci=_kode_key(herd.kategori))
+        suhu = herd.ukuran.get('rata_rata_suhu')
+        suhu_rata = float(np.nanmean(ke_float64(suhu))) if suhu is not None and len(suhu) else np.nan
+        items['jumlah_pakan_kg'] = (pd.to_numeric(items['jumlah_pakan_kg'], errors='coerce')
+                                    .fillna(defaults.get('pakan', np.nan))
+                                    .fillna(key.map(pakan_sapi)))
+        items['rata_rata_suhu'] = (pd.to_numeric(items['rata_rata_suhu'], errors='coerce')
+                                   .fillna(defaults.get('suhu', np.nan))
+                                   .fillna(suhu_rata))
+
+        for c in FITUR_COLS:
+            items[c] = pd.to_numeric(items[c], errors='coerce')
+
+        if mode == MODE_PER_SAPI:
+            tanggal_ok = items['tanggal_pemerahan'].notna()
+            model_ok = pd.Series(self.predictor.per_sapi_available(kode.to_numpy()), index=items.index)
+        else:
+            # satu lookup set untuk semua baris (bukan is_valid_date per baris)
+            tanggal_ok = items['tanggal_pemerahan'].isin(self.predictor.get_valid_dates())
+            model_ok = pd.Series(True, index=items.index)
+        fitur_ok = items[FITUR_COLS].notna().all(axis=1)
+        ok = tanggal_ok & fitur_ok & model_ok
+
+        def alasan(i):
+            if not tanggal_ok[i]:
+                return "Tanggal tidak valid."
+            if not fitur_ok[i]:
+                return "Fitur (umur/berat/pakan/suhu) tidak lengkap."
+            return "Model per sapi tidak tersedia (riwayat sapi kurang)."
+
+        gagal = [
+            {
+                'index': int(i),
+                'kode_sapi': row['kode_sapi'],
+                'tanggal_pemerahan': row['tanggal_pemerahan'],
+                'error': alasan(i)
+            }
+            for i, row in items[~ok].iterrows()
+        ]
+
+        hasil = items[ok].reset_index(drop=True)
+        hasil['produksi_susu'] = self.predictor.predict_batch(hasil['tanggal_pemerahan'].to_numpy(),
+                                                              hasil[FITUR_COLS].to_numpy(dtype=float),
+                                                              mode=mode, kode_list=hasil['kode_sapi'].to_numpy())
+        # satu panggilan aturan untuk semua baris; teks hanya untuk respons, riwayat menyimpan kode
+        kode = kode_rekomendasi(hasil['umur_tahun'], hasil['berat_badan_kg'],
+                                hasil['jumlah_pakan_kg'], hasil['rata_rata_suhu']).tolist()
+        hasil['kode_rekomendasi'] = [[k for k in baris if k] for baris in kode]
+        hasil['rekomendasi'] = [teks_rekomendasi(k) for k in hasil['kode_rekomendasi']]
+
+        if simpan:
+            self.history_manager.save_many([
+                {
+                    'Tanggal Pemerahan': r.tanggal_pemerahan,
+                    'Kode Sapi': r.kode_sapi,
+                    'Jumlah Pakan': r.jumlah_pakan_kg,
+                    'Suhu': r.rata_rata_suhu,
+                    'Umur': r.umur_tahun,
+                    'Berat Badan': r.berat_badan_kg,
+                    'Produksi Susu': r.produksi_susu,
+                    'Rekomendasi': r.kode_rekomendasi
+                }
+                for r in hasil.itertuples(index=False)
+            ], dataset=self.name)
+
+        return hasil, gagal
+
+    def iter_prediksi(self, mode=MODE_GABUNGAN, kode=None):
+        """
+        Prediksi semua sapi (atau `kode`) × semua tanggal valid untuk export, per potongan sapi
+        (~EXPORT_CHUNK_ROWS baris) dan tanpa disimpan ke riwayat; baris urut kolom riwayat.
+        """
+        kode = self.get_kode_sapi_list() if kode is None else kode
+        per_chunk = max(1, Config.EXPORT_CHUNK_ROWS // max(len(self.predictor.get_valid_dates()), 1))
+        for i in range(0, len(kode), per_chunk):
+            items = self.all_batch_items(kode[i:i + per_chunk])
+            if items.empty:
                 continue
+            hasil, _ = self.predict_batch(items, simpan=False, mode=mode)
+            if hasil.empty:
+                continue
+            yield [
+                (r.tanggal_pemerahan, r.kode_sapi, float(r.jumlah_pakan_kg), float(r.rata_rata_suhu),
+                 float(r.umur_tahun), float(r.berat_badan_kg), float(r.produksi_susu), ' | '.join(r.rekomendasi))
+                for r in hasil.itertuples(index=False)
+            ]
 
-        self.sapi_info = result
-        return self.sapi_info
-
-    def get_sapi_by_kode(self, kode_sapi):
-        return next((s for s in self.sapi_info if str(s.get('kode')) == str(kode_sapi)), None)
+    def predict_one(self, item, mode=MODE_GABUNGAN, simpan=True):
+        """
+        Prediksi satu item {kode_sapi, tanggal_pemerahan, pakan, suhu, umur, berat} lewat
+        micro-batch: dict hasil seperti item /api/predict/batch, atau {'error': ...}.
+        """
+        return self._batcher.submit((mode, simpan), item)
+
+    def _cek_item(self, item, mode, valid):
+        """Item /api/predict yang sudah dilengkapi umur & berat, atau {'error': ...}."""
+        sapi = self.sapi_index.get(self.normalize_kode(item['kode_sapi']), {})
+        umur = sapi.get('umur') if item['umur'] is None else item['umur']
+        berat = sapi.get('berat') if item['berat'] is None else item['berat']
+        if mode == MODE_PER_SAPI:
+            tanggal_ok = _format_tanggal_ok(item['tanggal_pemerahan'])
+        else:
+            tanggal_ok = item['tanggal_pemerahan'] in valid
+        if not tanggal_ok:
+            return {'error': "Tanggal tidak valid."}
+        if umur is None or berat is None:
+            return {'error': "Umur/berat tidak diisi dan kode sapi tidak ada di dataset."}
+        fitur = [float(item['pakan']), float(item['suhu']), float(umur), float(berat)]
+        if not np.isfinite(fitur).all():
+            return {'error': "Fitur (umur/berat/pakan/suhu) tidak lengkap."}
+        return {**item, 'mode': mode, 'umur': float(umur), 'berat': float(berat)}
+
+    def _predict_microbatch(self, key, items):
+        """
+        Satu batch /api/predict (mode & simpan sama): validasi per item, lalu satu predict_batch.
+        Item yang gagal divalidasi mendapat hasil error sendiri (dict 'error' atau exception),
+        item lain dalam batch tetap diprediksi.
+        """
+        mode, simpan = key
+        self.load_sapi_info()
+        valid = frozenset(self.predictor.get_valid_dates()) if mode != MODE_PER_SAPI else None
+        hasil = [None] * len(items)
+        ok = []
+        for i, item in enumerate(items):
+            try:
+                hasil[i] = self._cek_item(item, mode, valid)
+            except Exception as e:
+                hasil[i] = e
+                continue
+            if 'error' not in hasil[i]:
+                ok.append(i)
+
+        if mode == MODE_PER_SAPI and ok:
+            ada = self.predictor.per_sapi_available([items[i]['kode_sapi'] for i in ok])
+            for i in np.asarray(ok)[~ada]:
+                hasil[i] = {'error': "Model per sapi tidak tersedia (riwayat sapi kurang)."}
+            ok = [i for i, a in zip(ok, ada) if a]
+        if not ok:
+            return hasil
+
+        baris = [hasil[i] for i in ok]
+        fitur = np.array([[r[c] for c in ('pakan', 'suhu', 'umur', 'berat')] for r in baris], dtype=float)
+        produksi = self.predictor.predict_batch([r['tanggal_pemerahan'] for r in baris], fitur, mode=mode,
+                                                kode_list=[r['kode_sapi'] for r in baris])
+        kode = kode_rekomendasi(fitur[:, 2], fitur[:, 3], fitur[:, 0], fitur[:, 1]).tolist()
+        for r, p, k in zip(baris, produksi.tolist(), kode):
+            r['produksi_susu'] = p
+            r['kode_rekomendasi'] = [x for x in k if x]
+            r['rekomendasi'] = teks_rekomendasi(r['kode_rekomendasi'])
+
+        if simpan:
+            self.history_manager.save_many([
+                {
+                    'Tanggal Pemerahan': r['tanggal_pemerahan'],
+                    'Kode Sapi': r['kode_sapi'],
+                    'Jumlah Pakan': r['pakan'],
+                    'Suhu': r['suhu'],
+                    'Umur': r['umur'],
+                    'Berat Badan': r['berat'],
+                    'Produksi Susu': r['produksi_susu'],
+                    'Rekomendasi': r['kode_rekomendasi']
+                }
+                for r in baris
+            ], dataset=self.name)
+        return hasil
+
+
+def _format_tanggal_ok(tanggal):
+    try:
+        np.datetime64(tanggal, 'D')
+    except ValueError:
+        return False
+    return True
+
+
+def _buat_pool():
+    history_manager = HistoryManager()
+    pool = DatasetPool(lambda name: MilkPredictionApp(name, history_manager),
+                       Config.DATASET_MEMORY_BUDGET_MB * 2 ** 20, Config.DATASET_MAX_CONTEXTS)
+    metrics.register_cache('datasets', pool.stats)
+    return pool
+
+
+datasets = _buat_pool()
+jobs = JobQueue()
+# konteks dataset yang dipilih request ini (lihat _pilih_dataset)
+app_state = LocalProxy(lambda: g.app_state)
+
+
+@app.before_request
+def _mulai_timer():
+    g._mulai = time.perf_counter()
+
+
+def _dataset_dikenal(nama):
+    """Dataset default, yang sudah punya konteks (mis. sedang diunggah), atau terdaftar di registry."""
+    return (nama == Config.DEFAULT_DATASET or nama in datasets
+            or DatasetRegistry(registry_path(nama)).read() is not None)
+
+
+@app.before_request
+def _pilih_dataset():
+    """
+    Dataset dari ?dataset= / field form 'dataset' (diingat di session), atau pilihan terakhir.
+    Nama yang belum dikenal hanya diterima halaman upload (dataset baru); route lain 404,
+    supaya nama sembarang tidak membuat konteks (dan seri metrik) baru.
+    """
+    nama = request.args.get('dataset') or request.form.get('dataset')
+    if nama:
+        nama = normalize_dataset_name(nama)
+        if request.endpoint != 'upload_file' and not _dataset_dikenal(nama):
+            abort(404)
+        session['dataset'] = nama
+    else:
+        nama = session.get('dataset') or Config.DEFAULT_DATASET
+        if not _dataset_dikenal(nama):
+            session.pop('dataset', None)
+            nama = Config.DEFAULT_DATASET
+    g.app_state = datasets.get(nama)
 
 
-app_state = MilkPredictionApp()
+@app.after_request
+def _catat_latensi(response):
+    mulai = getattr(g, '_mulai', None)
+    if mulai is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('http_request_seconds', time.perf_counter() - mulai,
+                        route=route, method=request.method)
+    return response
 
 
 @app.route('/')
 def index():
-    if not app_state.data_path or not os.path.exists(app_state.data_path):
+    if not app_state.dataset.exists():
         flash("Silakan upload dataset.")
         return redirect(url_for('upload_file'))
 
-    df = pd.read_csv(app_state.data_path)
-
-    if app_state.predictor is None:
-        app_state.predictor = MilkPredictor(app_state.data_path)
-
     app_state.load_sapi_info()
-
-    # ambil nama kolom asli kode sapi jika ada, fallback ke 'kode sapi'
-    kode_col = None
-    cols_norm = MilkPredictionApp._normalize_columns(df.columns)
-    if 'kode_sapi' in cols_norm:
-        kode_col = df.columns[list(cols_norm).index('kode_sapi')]
-    else:
-        # fallback: cari kolom yang mengandung 'kode'
-        for c in df.columns:
-            if 'kode' in c.lower():
-                kode_col = c
-                break
-
-    kode_sapi = sorted(df[kode_col].unique()) if kode_col else []
+    kode_sapi = app_state.get_kode_sapi_list()
     return render_template("index.html",
+                           dataset_aktif=app_state.name,
+                           daftar_dataset=list_datasets(),
                            kode_sapi_list=kode_sapi,
                            tanggal_valid=app_state.predictor.get_valid_dates(),
                            hasil=None,
@@ -158,91 +496,68 @@ def upload_file():
             return redirect(request.url)
 
         filename = file.filename
-        path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        # disimpan dengan nama dari hash isi: upload dataset/peternakan lain tidak saling menimpa
+        folder = app.config['UPLOAD_FOLDER']
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f'.upload-{uuid.uuid4().hex}.csv')
         file.save(path)
+        kecil = os.path.getsize(path) <= Config.UPLOAD_SYNC_MAX_MB * 2 ** 20
 
-        try:
-            # baca file (coba dua encoding umum)
-            try:
-                df = pd.read_csv(path)
-            except UnicodeDecodeError:
-                df = pd.read_csv(path, encoding='latin1')
-
-            # normalisasi nama kolom untuk pengecekan
-            normalized = MilkPredictionApp._normalize_columns(df.columns)
-            normalized_set = set(normalized)
-
-            # required columns versi human (sesuaikan dengan format file awal)
-            required_columns_original = [
-                'kode sapi', 'umur (tahun)', 'berat badan (kg)',
-                'jumlah pakan (kg)', 'produksi susu/hari (liter)',
-                'tanggal pemerahan'
-            ]
-            # normalisasikan required untuk pengecekan
-            required_normalized = set(pd.Index(required_columns_original)
-                                      .str.strip()
-                                      .str.lower()
-                                      .str.replace('/', '_per_', regex=False)
-                                      .str.replace(r'[()\[\],%]', '', regex=True)
-                                      .str.replace(r'\s+', '_', regex=True)
-                                      .str.replace(r'__+', '_', regex=True)
-                                      .str.strip('_'))
-
-            missing = required_normalized - set(normalized)
-            if missing:
-                # tak perlu hapus file kalau mau debugging, tapi kita hapus untuk kebersihan
-                os.remove(path)
-                flash(f"❌ File tidak valid. Kolom berikut hilang: {', '.join(sorted(missing))}")
-                return redirect(request.url)
+        # parsing, validasi & pemanasan model berjalan sebagai job latar
+        ctx = app_state._get_current_object()
+        job_id = jobs.submit('upload', ctx.ingest_upload, path, filename, dataset=ctx.name)
+        if not (kecil or request.form.get('tunggu')):
+            return redirect(url_for('job_status', job_id=job_id))
 
-            # simpan path & preview df untuk diproses di /preview
-            app_state.data_path = path
-            app_state.df_preview = df
-            app_state.predictor = MilkPredictor(path)
-            app_state.load_sapi_info()
+        job = jobs.wait(job_id)
+        if job['status'] == 'gagal':
+            flash(f"❌ {job['pesan']}")
+            return redirect(request.url)
+        flash(f"✅ File {filename} berhasil diunggah dan divalidasi sebagai dataset '{ctx.name}'.")
+        return redirect(url_for('index'))
 
-            flash(f"✅ File {filename} berhasil diunggah dan divalidasi.")
-            return redirect(url_for('index'))
+    return render_template('upload.html', dataset_aktif=app_state.name)
 
-        except Exception as e:
-            if os.path.exists(path):
-                os.remove(path)
-            flash(f"❌ Terjadi kesalahan saat membaca file: {e}")
-            return redirect(request.url)
 
-    return render_template('upload.html')
+def _highlight_styles(data, mask):
+    """CSS highlight untuk satu potongan tabel, dibangun sekaligus dari mask boolean."""
+    import pandas as pd
+    css = pd.DataFrame('', index=data.index, columns=data.columns)
+    cols = [c for c in mask.columns if c in data.columns]
+    css[cols] = np.where(mask.loc[data.index, cols].to_numpy(), 'background-color: yellow', '')
+    return css
 
 
 @app.route("/preview")
 def preview():
-    if not getattr(app_state, 'data_path', None):
+    if not app_state.dataset.exists():
         flash("Silakan upload dataset terlebih dahulu.")
         return redirect(url_for('upload_file'))
 
     try:
-        # baca file asli
-        try:
-            df = pd.read_csv(app_state.data_path)
-        except UnicodeDecodeError:
-            df = pd.read_csv(app_state.data_path, encoding='latin1')
-
-        # gunakan fungsi preprocessing dari utils.preprocessing
-        processed_df, highlight_mask, steps_log = preprocess_data(df)
-
-        # Buat styling: highlight hanya pada kolom numeric yang ada di highlight_mask
-        # convert highlight_mask columns to present columns (if highlight_mask uses different names)
-        numeric_cols = highlight_mask.columns.tolist()
-
-        def highlight_col(col):
-            return ['background-color: yellow' if highlight_mask.loc[i, col.name] else '' for i in col.index]
-
-        # Terapkan styler hanya pada kolom yang ada di processed_df
-        styled = processed_df.style.apply(lambda col: highlight_col(col) if col.name in numeric_cols else ['' for _ in col.index], axis=0)
+        with metrics.span('preview.preprocess'):
+            processed_df, highlight_mask, steps_log = app_state.get_preprocessed()
+
+        # render hanya satu halaman; CSS dari highlight_mask dibuat sekaligus (bukan per sel)
+        per_halaman = Config.PREVIEW_ROWS
+        total = len(processed_df)
+        jumlah_halaman = max((total + per_halaman - 1) // per_halaman, 1)
+        halaman = min(max(request.args.get('halaman', 1, type=int), 1), jumlah_halaman)
+        potongan = processed_df.iloc[(halaman - 1) * per_halaman: halaman * per_halaman]
+
+        with metrics.span('preview.to_html'):
+            styled = potongan.style.apply(_highlight_styles, axis=None, mask=highlight_mask)
+            # kolom ukuran float32: tampilkan nilai desimalnya (46.12, bukan 46.119999)
+            styled = styled.format('{:.7g}', subset=list(potongan.select_dtypes('floating').columns))
+            tables = styled.to_html()
 
         return render_template(
             "preview.html",
-            tables=styled.to_html(),
-            steps=steps_log
+            tables=tables,
+            steps=steps_log,
+            halaman=halaman,
+            jumlah_halaman=jumlah_halaman,
+            total_baris=total
         )
 
     except Exception as e:
@@ -258,19 +573,23 @@ def predict():
     berat = float(request.form['berat'])
     pakan = float(request.form['pakan'])
     suhu = float(request.form['suhu'])
+    mode = request.form.get('mode', MODE_GABUNGAN)
 
     try:
-        if not app_state.predictor:
+        if mode not in MODES:
+            flash("Mode model tidak dikenal.")
+            return redirect(url_for('index'))
+
+        if not app_state.dataset.exists():
             flash("Model belum tersedia. Silakan upload ulang dataset.")
             return redirect(url_for('index'))
 
-        valid_dates = app_state.predictor.get_valid_dates()
-        if tanggal not in valid_dates:
+        if not app_state.predictor.is_valid_date(tanggal):
             flash("Tanggal tidak valid.")
             return redirect(url_for('index'))
 
         fitur = [pakan, suhu, umur, berat]
-        hasil = app_state.predictor.train_and_predict(tanggal, fitur)
+        hasil = app_state.predictor.train_and_predict(tanggal, fitur, mode=mode, kode_sapi=kode_sapi)
         rekomendasi = generate_rekomendasi(umur, berat, pakan, suhu)
 
         app_state.history_manager.save({
@@ -281,45 +600,272 @@ def predict():
             'Umur': umur,
             'Berat Badan': berat,
             'Produksi Susu': hasil,
-            'Rekomendasi': ' | '.join(rekomendasi)
-        })
+            'Rekomendasi': rekomendasi
+        }, dataset=app_state.name)
 
-        df = pd.read_csv(app_state.data_path)
         return render_template("index.html",
+                               dataset_aktif=app_state.name,
+                               daftar_dataset=list_datasets(),
                                hasil=hasil,
                                rekomendasi=rekomendasi,
-                               kode_sapi_list=sorted(df['kode sapi'].unique()),
-                               tanggal_valid=valid_dates
+                               kode_sapi_list=app_state.get_kode_sapi_list(),
+                               tanggal_valid=app_state.predictor.get_valid_dates()
                                )
     except Exception as e:
         flash(f"Terjadi kesalahan: {e}")
         return redirect(url_for('index'))
 
 
+def _riwayat_filters(args):
+    return {
+        'dataset': app_state.name,
+        'kode_sapi': args.get('kode_sapi') or None,
+        'dari': args.get('dari') or None,
+        'sampai': args.get('sampai') or None,
+    }
+
+
+def _parse_cursor(value):
+    """Cursor halaman berbentuk 'YYYY-MM-DD:id'."""
+    if not value or ':' not in value:
+        return None
+    tanggal, _, row_id = value.rpartition(':')
+    return (tanggal, int(row_id)) if row_id.isdigit() else None
+
+
+def _format_cursor(cursor):
+    return f"{cursor[0]}:{cursor[1]}" if cursor else None
+
+
 @app.route('/analisis')
 def analisis():
-    riwayat_df = app_state.history_manager.load()
-    if riwayat_df.empty:
-        return render_template("analisis.html", riwayat=None, koef=None)
-
-    if not app_state.predictor:
-        flash("Model belum tersedia untuk analisis.")
-        return redirect(url_for('index'))
+    filters = _riwayat_filters(request.args)
+    riwayat, cursor = app_state.history_manager.query(sebelum=_parse_cursor(request.args.get('sebelum')), **filters)
+    if not riwayat and not any(v for k, v in filters.items() if k != 'dataset') and not request.args.get('sebelum'):
+        return render_template("analisis.html", riwayat=None, koef=None, filters=filters, berikutnya=None)
 
-    model = app_state.predictor.get_analysis_model(riwayat_df)
     return render_template("analisis.html",
-                           riwayat=riwayat_df.to_dict(orient='records'),
-                           koef=model
+                           riwayat=riwayat,
+                           koef=app_state.analysis_model.coefficients(),
+                           filters=filters,
+                           berikutnya=_format_cursor(cursor)
                            )
 
 
-@app.route('/hapus_riwayat/<int:index>', methods=['POST'])
-def hapus(index):
-    app_state.history_manager.delete(index)
+@app.route('/api/riwayat')
+def api_riwayat():
+    """
+    Riwayat dalam bentuk JSON per halaman (?kode_sapi=&dari=&sampai=&sebelum=&limit=).
+    Dengan ?stream=1 semua halaman dialirkan sebagai NDJSON (satu baris JSON per record).
+    """
+    filters = _riwayat_filters(request.args)
+    limit = max(1, min(request.args.get('limit', Config.RIWAYAT_PAGE_SIZE, type=int), 1000))
+
+    if request.args.get('stream'):
+        def generate():
+            for rows in app_state.history_manager.iter_pages(limit=limit, **filters):
+                yield ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in rows)
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    rows, cursor = app_state.history_manager.query(sebelum=_parse_cursor(request.args.get('sebelum')),
+                                                   limit=limit, **filters)
+    return jsonify({'data': rows, 'berikutnya': _format_cursor(cursor)})
+
+
+def _export_response(format, nama, chunks):
+    """Response unduhan yang dialirkan (generator), kolom sama dengan riwayat.csv lama."""
+    mimetype, ekstensi = EXPORT_FORMATS[format]
+    angka = [d for d, c in RIWAYAT_COLUMNS if c in ANALISIS_COLS]
+    body = export_stream(format, [d for d, _ in RIWAYAT_COLUMNS], chunks, angka=angka)
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{nama}.{ekstensi}"'})
+
+
+@app.route('/export/riwayat')
+def export_riwayat():
+    """
+    Unduh riwayat dataset aktif (?format=csv|parquet|xlsx, filter sama dengan /analisis).
+    Dibaca per EXPORT_CHUNK_ROWS baris (keyset pagination) dan langsung dialirkan ke klien.
+    """
+    format = request.args.get('format', 'csv')
+    if format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Format harus salah satu dari {list(EXPORT_FORMATS)}."}), 400
+    chunks = app_state.history_manager.iter_rows(**_riwayat_filters(request.args))
+    return _export_response(format, f'riwayat-{app_state.name}', chunks)
+
+
+@app.route('/export/prediksi')
+def export_prediksi():
+    """
+    Unduh prediksi semua sapi × semua tanggal valid (?format=, ?mode=, ?kode_sapi=) tanpa menyimpan
+    ke riwayat; dihitung per potongan sapi sehingga hasil lengkap tidak pernah ada di memori.
+    """
+    if not app_state.dataset.exists():
+        return jsonify({'error': 'Model belum tersedia. Silakan upload dataset.'}), 400
+    format = request.args.get('format', 'csv')
+    if format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Format harus salah satu dari {list(EXPORT_FORMATS)}."}), 400
+    mode = request.args.get('mode', MODE_GABUNGAN)
+    if mode not in MODES:
+        return jsonify({'error': f"Mode harus salah satu dari {list(MODES)}."}), 400
+
+    ctx = app_state._get_current_object()
+    kode = request.args.get('kode_sapi')
+    if kode:
+        # dicek sebelum streaming: setelah header 200 terkirim, error hanya memotong file
+        sapi = ctx.get_sapi_by_kode(kode)
+        if sapi is None:
+            return jsonify({'error': f"Kode sapi {kode} tidak ditemukan."}), 404
+        kode = [sapi['kode']]
+    chunks = ctx.iter_prediksi(mode=mode, kode=kode or None)
+    return _export_response(format, f'prediksi-{ctx.name}', chunks)
+
+
+@app.route('/hapus_riwayat/<int:riwayat_id>', methods=['POST'])
+def hapus(riwayat_id):
+    app_state.history_manager.delete(riwayat_id, dataset=app_state.name)
     flash("Data berhasil dihapus.")
     return redirect(url_for('analisis'))
 
 
+def _batch_payload(hasil, gagal):
+    return {
+        'jumlah': len(hasil),
+        'hasil': [
+            {
+                'kode_sapi': r.kode_sapi,
+                'tanggal_pemerahan': r.tanggal_pemerahan,
+                'pakan': float(r.jumlah_pakan_kg),
+                'suhu': float(r.rata_rata_suhu),
+                'umur': float(r.umur_tahun),
+                'berat': float(r.berat_badan_kg),
+                'produksi_susu': float(r.produksi_susu),
+                'rekomendasi': r.rekomendasi,
+                'kode_rekomendasi': r.kode_rekomendasi
+            }
+            for r in hasil.itertuples(index=False)
+        ],
+        'gagal': gagal
+    }
+
+
+def _batch_response(hasil, gagal):
+    return jsonify(_batch_payload(hasil, gagal))
+
+
+def _angka(nilai):
+    return None if nilai is None or nilai == '' else float(nilai)
+
+
+@app.route('/api/predict', methods=['POST'])
+def api_predict():
+    """
+    Versi JSON dari form /predict, satu sapi per request:
+      {"kode_sapi": "SAPI01", "tanggal_pemerahan": "2025-05-20", "pakan": 35, "suhu": 28}
+    Opsional: "umur"/"berat" (default dari data sapi), "mode", "simpan": false.
+    Request bersamaan tidak dihitung sendiri-sendiri: koefisien per (dataset, tanggal) dihitung
+    sekali (utils.coalesce.SingleFlight) dan request dalam PREDICT_BATCH_WAIT_MS diprediksi
+    dengan satu perkalian matriks (MicroBatcher).
+    """
+    if not app_state.dataset.exists():
+        return jsonify({'error': 'Model belum tersedia. Silakan upload dataset.'}), 400
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Body harus berupa objek JSON.'}), 400
+    mode = data.get('mode', MODE_GABUNGAN)
+    if mode not in MODES:
+        return jsonify({'error': f"Mode harus salah satu dari {list(MODES)}."}), 400
+    try:
+        item = {
+            'kode_sapi': str(data['kode_sapi']).strip(),
+            'tanggal_pemerahan': str(data['tanggal_pemerahan']).strip(),
+            'pakan': float(data['pakan']),
+            'suhu': float(data['suhu']),
+            'umur': _angka(data.get('umur')),
+            'berat': _angka(data.get('berat')),
+        }
+    except KeyError as e:
+        return jsonify({'error': f"Field {e} wajib diisi."}), 400
+    except (TypeError, ValueError):
+        return jsonify({'error': "Pakan, suhu, umur dan berat harus berupa angka."}), 400
+
+    try:
+        hasil = app_state.predict_one(item, mode=mode, simpan=bool(data.get('simpan', True)))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    if 'error' in hasil:
+        return jsonify(hasil), 400
+    return jsonify(hasil)
+
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Body JSON:
+      {"items": [{"kode_sapi": "SAPI01", "tanggal_pemerahan": "2025-05-20", "pakan": 35, "suhu": 28}, ...]}
+      atau {"semua": true} untuk semua sapi × semua tanggal valid.
+    Opsional: "pakan"/"suhu" sebagai nilai default, "simpan": false agar tidak ditulis ke riwayat,
+    "mode": "gabungan" (default) | "per_sapi".
+    """
+    if not app_state.dataset.exists():
+        return jsonify({'error': 'Model belum tersedia. Silakan upload dataset.'}), 400
+
+    data = request.get_json(silent=True) or {}
+    mode = data.get('mode', MODE_GABUNGAN)
+    if mode not in MODES:
+        return jsonify({'error': f"Mode harus salah satu dari {list(MODES)}."}), 400
+    if data.get('semua'):
+        items = None
+    elif data.get('items'):
+        items = MilkPredictionApp.batch_items_from_records(data['items'])
+    else:
+        return jsonify({'error': "Isi 'items' atau 'semua': true."}), 400
+
+    if data.get('async'):
+        # dikerjakan di job latar; hasil diambil dari /api/jobs/<id>/hasil
+        ctx = app_state._get_current_object()
+        job_id = jobs.submit('batch', ctx.batch_job, items, data, data.get('simpan', True), mode, dataset=ctx.name)
+        return jsonify({'job_id': job_id, 'status_url': url_for('api_job', job_id=job_id)}), 202
+
+    if items is None:
+        items = app_state.all_batch_items()
+
+    try:
+        hasil, gagal = app_state.predict_batch(items, defaults=data, simpan=data.get('simpan', True), mode=mode)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    return _batch_response(hasil, gagal)
+
+
+@app.route('/api/predict/batch/csv', methods=['POST'])
+def predict_batch_csv():
+    """Sama seperti /api/predict/batch, input dari file CSV (kolom kode sapi, tanggal pemerahan, [pakan, suhu, umur, berat])."""
+    if not app_state.dataset.exists():
+        return jsonify({'error': 'Model belum tersedia. Silakan upload dataset.'}), 400
+
+    file = request.files.get('csvfile')
+    if not file or file.filename.strip() == '':
+        return jsonify({'error': 'File tidak ditemukan.'}), 400
+
+    import pandas as pd
+    try:
+        try:
+            raw = pd.read_csv(file)
+        except UnicodeDecodeError:
+            file.seek(0)
+            raw = pd.read_csv(file, encoding='latin1')
+        items = MilkPredictionApp.batch_items_from_records(raw)
+        mode = request.form.get('mode', MODE_GABUNGAN)
+        if mode not in MODES:
+            return jsonify({'error': f"Mode harus salah satu dari {list(MODES)}."}), 400
+        hasil, gagal = app_state.predict_batch(items, defaults=request.form, mode=mode,
+                                               simpan=request.form.get('simpan', '1') != '0')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    return _batch_response(hasil, gagal)
+
+
 @app.route('/get_sapi_info', methods=['POST'])
 def get_sapi_info():
     data = request.get_json()
@@ -334,5 +880,113 @@ def get_sapi_info():
     else:
         return jsonify({'umur': '', 'berat': ''}), 404
 
+
+@app.route('/api/sapi')
+def api_sapi():
+    """Data umur & berat seluruh sapi sekaligus, untuk prefill form tanpa request per pilihan."""
+    if not app_state.dataset.exists():
+        return jsonify({})
+    return jsonify({
+        str(s['kode']): {'umur': float(s['umur']), 'berat': float(s['berat'])}
+        for s in app_state.load_sapi_info()
+    })
+
+
+@app.route('/api/fitur')
+def api_fitur():
+    """
+    Fitur deret waktu per sapi per hari: produksi hari sebelumnya, rata-rata 7 & 14 hari
+    sebelumnya, dan rasio pakan/produksi. Filter: kode_sapi, dari, sampai (YYYY-MM-DD).
+    """
+    if not app_state.dataset.exists():
+        return jsonify({'error': 'Model belum tersedia. Silakan upload dataset.'}), 400
+    try:
+        fitur = app_state.features.query(kode_sapi=request.args.get('kode_sapi'),
+                                         dari=request.args.get('dari') or None,
+                                         sampai=request.args.get('sampai') or None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    kolom = ['produksi', 'pakan'] + FITUR_WAKTU
+    nilai = fitur[kolom].to_numpy(dtype=float).round(4)
+    return jsonify({
+        'jumlah': len(fitur),
+        'fitur': [
+            {'tanggal_pemerahan': t, 'kode_sapi': k,
+             **{c: (None if v != v else float(v)) for c, v in zip(kolom, baris)}}
+            for t, k, baris in zip(fitur['tanggal'].dt.strftime('%Y-%m-%d'), fitur['kode_sapi'], nilai.tolist())
+        ],
+    })
+
+
+def job_result_path(job_id):
+    return os.path.join(Config.JOB_RESULT_FOLDER, f'{job_id}.json')
+
+
+def _job_json(job):
+    data = {k: job[k] for k in ('id', 'jenis', 'dataset', 'status', 'progress', 'pesan', 'hasil')}
+    if job['status'] == 'selesai':
+        data['url_hasil'] = (url_for('job_hasil', job_id=job['id']) if job['jenis'] == 'batch'
+                             else url_for('index', dataset=job['dataset']))
+    return data
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Halaman progress job (mem-poll /api/jobs/<id>)."""
+    job = jobs.get(job_id)
+    if job is None:
+        flash("Job tidak ditemukan.")
+        return redirect(url_for('index'))
+    return render_template('job.html', job=_job_json(job))
+
+
+@app.route('/api/jobs/<job_id>')
+def api_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job tidak ditemukan.'}), 404
+    return jsonify(_job_json(job))
+
+
+@app.route('/api/jobs/<job_id>/hasil')
+def job_hasil(job_id):
+    """Hasil lengkap job batch prediksi (format sama dengan /api/predict/batch)."""
+    job = jobs.get(job_id)
+    if job is None or job['jenis'] != 'batch':
+        return jsonify({'error': 'Job tidak ditemukan.'}), 404
+    if job['status'] != 'selesai':
+        return jsonify(_job_json(job)), 409
+    with open(job_result_path(job_id), 'rb') as f:
+        return Response(f.read(), mimetype='application/json')
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Metrik latensi route, span internal & cache dalam format teks Prometheus."""
+    return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/system_info')
+def system_info():
+    dataset = app_state.dataset
+    system_data = {
+        'Python': sys.version.split()[0],
+        'Platform': platform.platform(),
+        'PID': os.getpid(),
+        'Dataset aktif': app_state.name,
+        'File dataset': dataset.path or '-',
+        'Versi dataset': dataset.version or '-',
+        'Jumlah baris': len(dataset.herd) if dataset.is_loaded() else '-',
+        'Memori dataset (MB)': round(dataset.memory_bytes() / 2 ** 20, 2),
+    }
+    snapshot = metrics.snapshot()
+    latensi = [h for h in snapshot['histograms'] if h['metric'] == 'http_request_seconds']
+    spans = [h for h in snapshot['histograms'] if h['metric'] == 'span_seconds']
+    system_data['Dataset di worker ini'] = f"{len(datasets)} ({datasets.memory_bytes() / 2 ** 20:.1f} MB)"
+    return render_template('system_info.html', system_data=system_data,
+                           latensi=latensi, spans=spans, caches=snapshot['caches'])
+
+
 if __name__ == '__main__':
    app.run(debug=True)
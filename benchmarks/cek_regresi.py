@@ -0,0 +1,116 @@
+"""
+Cek solver regresi bentuk tertutup (models.regression) terhadap sklearn LinearRegression.
+
+Dataset sintetis (lihat synthetic.py) dimuat lewat DatasetStore seperti aplikasi, lalu:
+- koefisien jendela 14 hari semua tanggal valid (sliding window, rolling_window_coefficients)
+  dan solve langsung satu jendela (_fit_window, jalur saat LRU miss);
+- model per sapi (grouped_least_squares), termasuk umur/berat yang konstan di dalam satu sapi;
+dibandingkan dengan LinearRegression yang dilatih pada baris yang sama. Keluar dengan status 1
+bila ada koefisien yang tidak np.allclose.
+
+Contoh:
+    python benchmarks/cek_regresi.py
+    python benchmarks/cek_regresi.py --sapi 50 --hari 90 --seed 3
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from run import _set_paths  # noqa: E402
+from synthetic import write_herd  # noqa: E402
+from config import Config  # noqa: E402
+
+RTOL = 1e-6
+ATOL = 1e-8
+
+
+def _sklearn(X, y):
+    from sklearn.linear_model import LinearRegression
+
+    model = LinearRegression().fit(X, y)
+    return np.concatenate([[model.intercept_], model.coef_])
+
+
+def cek_jendela(predictor, herd):
+    """Jumlah tanggal yang dicek dan daftar tanggal yang koefisiennya berbeda."""
+    from models.predictor import FITUR_COLS, TANGGAL_COL, TARGET_COL, WINDOW_DAYS
+
+    mask = herd.lengkap([TANGGAL_COL] + FITUR_COLS + [TARGET_COL])
+    hari = herd.hari[TANGGAL_COL]
+    tanggal_list, coefs = predictor._compute_window_coefficients()
+    beda = []
+    for tanggal, coef in zip(tanggal_list, coefs):
+        t = np.datetime64(tanggal, 'D')
+        t_int = int(t.astype(np.int64))
+        m = mask & (hari >= t_int - WINDOW_DAYS) & (hari < t_int)
+        ref = _sklearn(herd.matrix(FITUR_COLS, m), herd.matrix([TARGET_COL], m)[:, 0])
+        if not (np.allclose(coef, ref, rtol=RTOL, atol=ATOL)
+                and np.allclose(predictor._fit_window(t), ref, rtol=RTOL, atol=ATOL)):
+            beda.append(tanggal)
+    return len(tanggal_list), beda
+
+
+def cek_per_sapi(predictor, herd):
+    """Jumlah sapi yang dicek dan daftar kode sapi yang koefisiennya berbeda."""
+    from models.predictor import FITUR_COLS, PER_SAPI_MIN_ROWS, TARGET_COL, _kode_key
+
+    mask = herd.lengkap(['kode_sapi'] + FITUR_COLS + [TARGET_COL])
+    kode_baris = np.where(herd.kode >= 0, herd.kode, 0)
+    kunci = _kode_key(herd.kategori)[kode_baris]
+    kode, coef = predictor.fit_per_sapi()
+    beda = []
+    for k, c in zip(kode, coef):
+        m = mask & (kunci == k)
+        if m.sum() < PER_SAPI_MIN_ROWS:
+            ok = np.isnan(c).all()
+        else:
+            ref = _sklearn(herd.matrix(FITUR_COLS, m), herd.matrix([TARGET_COL], m)[:, 0])
+            ok = np.allclose(c, ref, rtol=RTOL, atol=ATOL)
+        if not ok:
+            beda.append(str(k))
+    return len(kode), beda
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sapi', type=int, default=20)
+    parser.add_argument('--hari', type=int, default=45)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from models.artifacts import ArtifactStore
+    from models.dataset import DatasetStore
+    from models.predictor import MilkPredictor
+
+    workdir = tempfile.mkdtemp(prefix='cek_regresi_')
+    try:
+        _set_paths(workdir)
+        csv_path = os.path.join(workdir, 'herd.csv')
+        write_herd(csv_path, args.sapi, args.hari, seed=args.seed)
+        store = DatasetStore(csv_path)
+        herd = store.get_herd()
+        # folder artefak kosong: koefisien benar-benar dihitung, bukan dimuat dari .npz
+        predictor = MilkPredictor(store, artifacts=ArtifactStore(os.path.join(Config.CACHE_FOLDER, 'cek')))
+
+        gagal = False
+        for nama, cek in (('jendela', cek_jendela), ('per sapi', cek_per_sapi)):
+            jumlah, beda = cek(predictor, herd)
+            print(f'{nama}: {jumlah - len(beda)}/{jumlah} cocok dengan LinearRegression')
+            if beda:
+                gagal = True
+                print(f'  berbeda: {", ".join(beda[:10])}', file=sys.stderr)
+        if gagal:
+            sys.exit(1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
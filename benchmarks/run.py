@@ -0,0 +1,415 @@
+"""
+Benchmark jalur prediksi & upload dengan dataset sintetis (lihat synthetic.py).
+
+Contoh:
+    python benchmarks/run.py --skala kecil sedang --output hasil.json
+    python benchmarks/run.py --skala penuh --ulang 3 --bandingkan hasil_lama.json
+
+Setiap skala berjalan di direktori sementara (upload, cache, riwayat.db terpisah) lalu
+mengukur latensi (min/median/mean/max), throughput (item per detik dari median) dan
+puncak alokasi memori (tracemalloc, di lintasan terpisah supaya tidak memperlambat
+pengukuran waktu). Hasil berupa JSON supaya antar-run bisa dibandingkan.
+
+Memori dataset dilaporkan per sejuta baris: HerdData ringkas (models.herd), DataFrame yang
+dibangun darinya, dan DataFrame lebar lama (kode object, float64, datetime64[ns]) sebagai pembanding.
+
+Varian `_dingin` predictor memakai folder artefak kosong per pengulangan (komputasi penuh),
+`_artefak` memuat artefak .npz yang sudah ditulis (jalur worker baru), `_hangat` dari cache memori.
+
+Request /api/predict bersamaan diukur dengan cache koefisien dikosongkan dulu, sehingga yang
+terlihat adalah biaya satu komputasi bersama (single-flight) + micro-batch, bukan hit cache.
+
+Waktu startup (impor `app` + request pertama dari artefak tersimpan) diukur di proses
+Python baru per pengulangan, beserta modul berat (pandas/pyarrow/sklearn) yang ikut termuat.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import SCALES, write_herd  # noqa: E402
+from config import Config  # noqa: E402
+
+JUMLAH_TANGGAL = 50      # tanggal valid yang diprediksi per pengukuran train_and_predict
+JUMLAH_SIMPAN = 200      # baris HistoryManager.save per pengukuran
+JUMLAH_BATCH = 500       # item /api/predict/batch per request
+JUMLAH_BERSAMAAN = 32    # request /api/predict bersamaan (thread) untuk tanggal yang sama
+MODUL_BERAT = ('pandas', 'pyarrow', 'sklearn')
+
+# dijalankan di interpreter baru: argv = ROOT, path Config (JSON), form /predict (JSON atau '')
+STARTUP_SCRIPT = '''
+import json, sys, time
+mulai = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from config import Config
+for k, v in json.loads(sys.argv[2]).items():
+    setattr(Config, k, v)
+import app
+hasil = {'import_s': time.perf_counter() - mulai,
+         'modul_import': [m for m in %r if m in sys.modules]}
+if sys.argv[3]:
+    client = app.app.test_client()
+    mulai = time.perf_counter()
+    for r in (client.get('/'), client.post('/predict', data=json.loads(sys.argv[3]))):
+        assert r.status_code == 200, r.status_code
+    hasil['request_s'] = time.perf_counter() - mulai
+    hasil['modul_request'] = [m for m in %r if m in sys.modules]
+print(json.dumps(hasil))
+''' % (MODUL_BERAT, MODUL_BERAT)
+
+
+def measure(fn, setup=None, ulang=5, items=1):
+    """
+    Jalankan `fn(state)` sebanyak `ulang` kali (state dari `setup()` bila ada, tidak ikut diukur),
+    lalu satu kali lagi di bawah tracemalloc untuk puncak memori.
+    """
+    durasi = []
+    for _ in range(ulang):
+        state = setup() if setup else None
+        mulai = time.perf_counter()
+        fn(state)
+        durasi.append(time.perf_counter() - mulai)
+
+    state = setup() if setup else None
+    tracemalloc.start()
+    try:
+        fn(state)
+        _, puncak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {**_ringkas(durasi, items), 'peak_mem_mb': puncak / 2 ** 20}
+
+
+def _ringkas(durasi, items=1):
+    median = statistics.median(durasi)
+    return {
+        'ulang': len(durasi),
+        'items': items,
+        'latency_ms': {
+            'min': min(durasi) * 1000,
+            'median': median * 1000,
+            'mean': statistics.fmean(durasi) * 1000,
+            'max': max(durasi) * 1000,
+        },
+        'throughput_per_s': items / median if median else None,
+    }
+
+
+def _paths(workdir):
+    cache = os.path.join(workdir, 'cache')
+    return {
+        'UPLOAD_FOLDER': workdir,
+        'CACHE_FOLDER': cache,
+        'REGISTRY_FOLDER': os.path.join(cache, 'registry'),
+        'JOBS_DB_PATH': os.path.join(workdir, 'jobs.db'),
+        'JOB_RESULT_FOLDER': os.path.join(cache, 'jobs'),
+        'RIWAYAT_DB_PATH': os.path.join(workdir, 'riwayat.db'),
+        'RIWAYAT_PATH': os.path.join(workdir, 'riwayat.csv'),   # tidak ada: tanpa import CSV lama
+    }
+
+
+def _set_paths(workdir):
+    """Arahkan semua path Config ke direktori kerja sementara."""
+    for nama, nilai in _paths(workdir).items():
+        setattr(Config, nama, nilai)
+
+
+def _reset_cache():
+    shutil.rmtree(Config.CACHE_FOLDER, ignore_errors=True)
+
+
+def bench_fungsi(csv_path, rows, ulang):
+    from models.artifacts import ArtifactStore
+    from models.dataset import DatasetStore
+    from models.features import harian, hitung_fitur, tambah_hari
+    from models.history import HistoryManager
+    from models.predictor import MilkPredictor
+    from utils.preprocessing import preprocess_data
+    from utils.validator import kode_rekomendasi
+
+    hasil = {}
+
+    def load_dingin(_):
+        DatasetStore().load(csv_path)
+
+    def setup_dingin():
+        _reset_cache()
+
+    hasil['dataset.load_dingin'] = measure(load_dingin, setup_dingin, ulang, rows)
+    hasil['dataset.load_hangat'] = measure(lambda _: DatasetStore().load(csv_path), None, ulang, rows)
+
+    store = DatasetStore(csv_path)
+
+    def prediktor_dingin():
+        # folder artefak kosong per pengulangan: yang diukur komputasinya, bukan memuat .npz
+        return MilkPredictor(store, artifacts=ArtifactStore(tempfile.mkdtemp(dir=Config.UPLOAD_FOLDER)))
+
+    artefak = ArtifactStore(tempfile.mkdtemp(dir=Config.UPLOAD_FOLDER))
+    MilkPredictor(store, artifacts=artefak).precompute_coefficients()
+
+    def prediktor_artefak():
+        # artefak sudah ada (worker lain / restart): hanya memuat .npz
+        return MilkPredictor(store, artifacts=artefak)
+
+    hasil['predictor.get_valid_dates_dingin'] = measure(lambda p: p.get_valid_dates(), prediktor_dingin, ulang)
+    hasil['predictor.get_valid_dates_artefak'] = measure(lambda p: p.get_valid_dates(), prediktor_artefak, ulang)
+    hangat = MilkPredictor(store)
+    valid = hangat.get_valid_dates()
+    hasil['predictor.get_valid_dates_hangat'] = measure(lambda _: hangat.get_valid_dates(), None, ulang)
+
+    langkah = max(1, len(valid) // JUMLAH_TANGGAL)
+    tanggal = valid[::langkah][:JUMLAH_TANGGAL]
+    fitur = [40.0, 28.5, 6.0, 550.0]
+
+    def prediksi(p):
+        for t in tanggal:
+            p.train_and_predict(t, fitur)
+
+    if tanggal:
+        hasil['predictor.train_and_predict_dingin'] = measure(prediksi, prediktor_dingin, ulang, len(tanggal))
+        hasil['predictor.train_and_predict_artefak'] = measure(prediksi, prediktor_artefak, ulang, len(tanggal))
+        hasil['predictor.train_and_predict_hangat'] = measure(
+            lambda _: prediksi(hangat), None, ulang, len(tanggal))
+
+    hasil['predictor.fit_per_sapi'] = measure(lambda p: p.fit_per_sapi(), prediktor_dingin, ulang, rows)
+    hasil['preprocess_data'] = measure(lambda df: preprocess_data(df), lambda: store.frame.copy(), ulang, rows)
+    kolom = [store.herd.ukuran[c] for c in ('umur_tahun', 'berat_badan_kg', 'jumlah_pakan_kg', 'rata_rata_suhu')]
+    hasil['validator.kode_rekomendasi'] = measure(lambda _: kode_rekomendasi(*kolom), None, ulang, rows)
+
+    daily = harian(store.herd)
+    hari_akhir = daily['tanggal'] == daily['tanggal'].max()
+    hasil['features.hitung_fitur'] = measure(lambda _: hitung_fitur(daily), None, ulang, rows)
+    lama = hitung_fitur(daily[~hari_akhir])
+    hasil['features.tambah_hari'] = measure(lambda _: tambah_hari(lama, daily[hari_akhir]), None, ulang,
+                                            int(hari_akhir.sum()))
+
+    record = {
+        'Tanggal Pemerahan': tanggal[0] if tanggal else '2025-01-15', 'Kode Sapi': 'SAPI01',
+        'Jumlah Pakan': 40.0, 'Suhu': 28.5, 'Umur': 6.0, 'Berat Badan': 550.0,
+        'Produksi Susu': 12.3, 'Rekomendasi': ['Pakan cukup'],
+    }
+    nomor = iter(range(10 ** 9))
+
+    def history_baru():
+        path = os.path.join(Config.UPLOAD_FOLDER, f'riwayat_bench_{next(nomor)}.db')
+        return HistoryManager(path=path, csv_path=Config.RIWAYAT_PATH)
+
+    def simpan(hm):
+        for _ in range(JUMLAH_SIMPAN):
+            hm.save(record)
+
+    hasil['history.save'] = measure(simpan, history_baru, ulang, JUMLAH_SIMPAN)
+    return hasil, tanggal
+
+
+def bench_memori(csv_path, rows):
+    from models.dataset import DatasetStore
+
+    store = DatasetStore(csv_path)
+    herd, frame = store.herd, store.frame
+    lebar = frame.astype({c: 'float64' for c in herd.ukuran})
+    lebar['kode_sapi'] = lebar['kode_sapi'].astype(str).astype(object)
+
+    def per_juta(nbytes):
+        return float(nbytes) / max(rows, 1) * 1e6 / 2 ** 20
+
+    return {
+        'herd_mb_per_juta_baris': per_juta(herd.nbytes()),
+        'frame_mb_per_juta_baris': per_juta(frame.memory_usage(deep=True).sum()),
+        'frame_lebar_mb_per_juta_baris': per_juta(lebar.memory_usage(deep=True).sum()),
+    }
+
+
+def bench_route(csv_path, tanggal, ulang):
+    import app as appmod
+
+    appmod.app.config['UPLOAD_FOLDER'] = Config.UPLOAD_FOLDER
+    appmod.app.config['TESTING'] = True
+    appmod.datasets = appmod._buat_pool()
+    appmod.jobs.shutdown()
+    appmod.jobs = appmod.JobQueue()
+    client = appmod.app.test_client()
+
+    with open(csv_path, 'rb') as f:
+        isi = f.read()
+
+    def cek(response):
+        if response.status_code >= 400:
+            raise RuntimeError(f'{response.request.path}: HTTP {response.status_code}')
+        return response
+
+    def upload(_):
+        # tunggu=1: ukur parsing + pemanasan model, bukan hanya pendaftaran job
+        cek(client.post('/upload', data={'csvfile': (io.BytesIO(isi), 'upload.csv'), 'tunggu': '1'},
+                        content_type='multipart/form-data'))
+
+    def dingin():
+        # cache & artefak di disk dihapus, konteks dataset di memori juga dibuang
+        _reset_cache()
+        appmod.datasets = appmod._buat_pool()
+
+    hasil = {'route.upload_dingin': measure(upload, dingin, ulang, 1)}
+    dingin()
+    upload(None)
+
+    hasil['route.index'] = measure(lambda _: cek(client.get('/')), None, ulang)
+    hasil['route.preview'] = measure(lambda _: cek(client.get('/preview')), None, ulang)
+    if tanggal:
+        form = dict(tanggal_pemerahan=tanggal[-1], kode_sapi='SAPI01', umur='6', berat='550',
+                    pakan='40', suhu='28.5')
+        hasil['route.predict'] = measure(lambda _: cek(client.post('/predict', data=form)), None, ulang)
+
+        kode = appmod.datasets.get(Config.DEFAULT_DATASET).get_kode_sapi_list()
+        items = [{'kode_sapi': kode[i % len(kode)], 'tanggal_pemerahan': tanggal[i % len(tanggal)]}
+                 for i in range(JUMLAH_BATCH)]
+        body = {'items': items, 'simpan': False}
+        hasil['route.api_predict_batch'] = measure(
+            lambda _: cek(client.post('/api/predict/batch', json=body)), None, ulang, JUMLAH_BATCH)
+
+        def kosongkan():
+            predictor = appmod.datasets.get(Config.DEFAULT_DATASET).predictor
+            predictor.coef_cache.clear()
+            predictor._precomputed_version = None
+
+        def bersamaan(_):
+            json_body = {**form, 'simpan': False}
+            status = []
+            kirim = lambda: status.append(appmod.app.test_client().post('/api/predict', json=json_body).status_code)
+            threads = [threading.Thread(target=kirim) for _ in range(JUMLAH_BERSAMAAN)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            if max(status) >= 400:
+                raise RuntimeError(f'/api/predict: HTTP {max(status)}')
+
+        hasil['route.api_predict_bersamaan'] = measure(bersamaan, kosongkan, ulang, JUMLAH_BERSAMAAN)
+    hasil['route.analisis'] = measure(lambda _: cek(client.get('/analisis')), None, ulang)
+    hasil['route.export_riwayat'] = measure(lambda _: cek(client.get('/export/riwayat')), None, ulang)
+    return hasil
+
+
+def bench_startup(workdir, tanggal, ulang):
+    """
+    Impor `app` di proses baru (cold start worker), lalu bila `tanggal` ada: GET / + POST /predict
+    pertama yang dilayani artefak dataset hasil bench_route.
+    """
+    form = ''
+    if tanggal:
+        form = json.dumps(dict(tanggal_pemerahan=tanggal[-1], kode_sapi='SAPI01', umur='6', berat='550',
+                               pakan='40', suhu='28.5'))
+    runs = []
+    for _ in range(ulang):
+        out = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, ROOT, json.dumps(_paths(workdir)), form],
+                             cwd=workdir, capture_output=True, text=True)
+        if out.returncode != 0:
+            raise RuntimeError(f'startup gagal:\n{out.stderr}')
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    hasil = {'startup.import_app': {**_ringkas([r['import_s'] for r in runs]),
+                                    'modul_berat': runs[-1]['modul_import']}}
+    if tanggal:
+        hasil['startup.request_pertama'] = {**_ringkas([r['request_s'] for r in runs], 2),
+                                            'modul_berat': runs[-1]['modul_request']}
+    return hasil
+
+
+def _meta(args):
+    from importlib.metadata import version
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'waktu': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'versi': {nama: version(nama) for nama in ('numpy', 'pandas', 'pyarrow', 'flask')},
+        'seed': args.seed,
+        'ulang': args.ulang,
+    }
+
+
+def bandingkan(lama, baru):
+    """Cetak rasio median latensi baru/lama per skala & benchmark (< 1 berarti lebih cepat)."""
+    print(f"{'skala':<8} {'benchmark':<40} {'lama ms':>10} {'baru ms':>10} {'rasio':>7}", file=sys.stderr)
+    for skala, data in baru['skala'].items():
+        sebelumnya = lama.get('skala', {}).get(skala, {}).get('hasil', {})
+        for nama, h in data['hasil'].items():
+            if nama not in sebelumnya:
+                continue
+            a = sebelumnya[nama]['latency_ms']['median']
+            b = h['latency_ms']['median']
+            print(f"{skala:<8} {nama:<40} {a:>10.2f} {b:>10.2f} {b / a if a else float('nan'):>7.2f}",
+                  file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--skala', nargs='+', default=['kecil', 'sedang'], choices=sorted(SCALES),
+                        help='preset ukuran dataset (jumlah sapi × hari)')
+    parser.add_argument('--ulang', type=int, default=5, help='jumlah pengulangan per pengukuran')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='tulis hasil JSON ke file (default: stdout)')
+    parser.add_argument('--bandingkan', help='JSON hasil run sebelumnya untuk dibandingkan')
+    parser.add_argument('--tanpa-route', action='store_true', help='lewati benchmark route Flask')
+    args = parser.parse_args(argv)
+
+    laporan = {'meta': _meta(args), 'skala': {}}
+    for nama in args.skala:
+        n_sapi, n_hari = SCALES[nama]
+        workdir = tempfile.mkdtemp(prefix=f'bench_{nama}_')
+        try:
+            _set_paths(workdir)
+            csv_path = os.path.join(workdir, 'herd.csv')
+            mulai = time.perf_counter()
+            rows = write_herd(csv_path, n_sapi, n_hari, seed=args.seed)
+            print(f'[{nama}] {n_sapi} sapi × {n_hari} hari = {rows} baris '
+                  f'({time.perf_counter() - mulai:.1f} dtk generate)', file=sys.stderr)
+
+            hasil, tanggal = bench_fungsi(csv_path, rows, args.ulang)
+            if not args.tanpa_route:
+                hasil.update(bench_route(csv_path, tanggal, args.ulang))
+            # tanpa route: belum ada dataset terdaftar, jadi hanya waktu impor
+            hasil.update(bench_startup(workdir, None if args.tanpa_route else tanggal, args.ulang))
+            laporan['skala'][nama] = {
+                'sapi': n_sapi,
+                'hari': n_hari,
+                'baris': rows,
+                'csv_mb': os.path.getsize(csv_path) / 2 ** 20,
+                'memori': bench_memori(csv_path, rows),
+                'hasil': hasil,
+            }
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    teks = json.dumps(laporan, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(teks + '\n')
+    else:
+        print(teks)
+
+    if args.bandingkan:
+        with open(args.bandingkan) as f:
+            bandingkan(json.load(f), laporan)
+
+
+if __name__ == '__main__':
+    main()
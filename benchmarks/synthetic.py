@@ -0,0 +1,84 @@
+"""
+Generator dataset peternakan sintetis dengan skema yang sama seperti `contoh csv.csv`
+(header asli, format tanggal m/d/Y), untuk benchmark.
+"""
+import numpy as np
+import pandas as pd
+
+HEADER = [
+    'kode sapi', 'umur (tahun)', 'berat badan (kg)', 'tanggal pemerahan', 'jumlah pakan (kg)',
+    'produksi susu pagi (liter)', 'produksi susu sore (liter)', 'produksi susu/hari (liter)',
+    'Rata-rata Suhu', 'tanggal lahir',
+]
+
+# preset skala: nama -> (jumlah sapi, jumlah hari)
+SCALES = {
+    'kecil': (10, 30),
+    'sedang': (100, 180),
+    'besar': (1000, 365),
+    'penuh': (5000, 3 * 365),
+}
+
+
+def _format_tanggal(tanggal):
+    # m/d/Y tanpa nol di depan (seperti file contoh); '%-m' tidak portabel ke Windows
+    tanggal = pd.DatetimeIndex(tanggal)
+    return (tanggal.month.astype(str) + '/' + tanggal.day.astype(str) + '/' + tanggal.year.astype(str)).to_numpy()
+
+
+def generate_herd(n_sapi, n_hari, seed=0, mulai='2025-01-01', outlier_rate=0.005, hari_per_chunk=None):
+    """
+    Generator DataFrame per blok hari (urut tanggal lalu kode sapi, seperti file contoh).
+
+    Produksi susu mengikuti model linier pakan/suhu/umur/berat + noise, jadi regresi
+    jendela 14 hari punya sinyal nyata; sebagian kecil nilai dijadikan outlier
+    supaya langkah IQR di preprocessing ikut bekerja.
+    """
+    rng = np.random.default_rng(seed)
+    mulai = pd.Timestamp(mulai)
+    kode = np.array([f'SAPI{i + 1:0{max(2, len(str(n_sapi)))}d}' for i in range(n_sapi)], dtype=object)
+    umur = np.round(rng.uniform(3, 10, n_sapi), 1)
+    berat = np.round(rng.uniform(450, 650, n_sapi))
+    lahir = _format_tanggal(mulai - pd.to_timedelta(np.round(umur * 365.25), unit='D'))
+    basis = rng.normal(0, 1.5, n_sapi)
+    suhu_harian = np.round(28.5 + 2.5 * np.sin(np.arange(n_hari) * 2 * np.pi / 365) +
+                           rng.normal(0, 1, n_hari), 1)
+
+    hari_per_chunk = hari_per_chunk or max(1, 200_000 // max(n_sapi, 1))
+    for awal in range(0, n_hari, hari_per_chunk):
+        hari = np.arange(awal, min(awal + hari_per_chunk, n_hari))
+        n = len(hari) * n_sapi
+        idx = np.tile(np.arange(n_sapi), len(hari))
+        hari_rep = np.repeat(hari, n_sapi)
+        suhu = suhu_harian[hari_rep]
+        pakan = np.round(rng.normal(40, 5, n), 2)
+        total = (4 + 0.25 * pakan - 0.3 * (suhu - 28) - 0.4 * np.abs(umur[idx] - 6) +
+                 0.005 * (berat[idx] - 550) + basis[idx] + rng.normal(0, 0.8, n))
+        total = np.clip(total, 0.5, None)
+        outlier = rng.random(n) < outlier_rate
+        total[outlier] *= rng.uniform(2, 3, outlier.sum())
+        pagi = np.round(total * rng.uniform(0.45, 0.55, n), 2)
+        sore = np.round(total - pagi, 2)
+        tanggal = _format_tanggal(mulai + pd.to_timedelta(hari_rep, unit='D'))
+        yield pd.DataFrame({
+            'kode sapi': kode[idx],
+            'umur (tahun)': umur[idx],
+            'berat badan (kg)': berat[idx],
+            'tanggal pemerahan': tanggal,
+            'jumlah pakan (kg)': pakan,
+            'produksi susu pagi (liter)': pagi,
+            'produksi susu sore (liter)': sore,
+            'produksi susu/hari (liter)': np.round(pagi + sore, 2),
+            'Rata-rata Suhu': suhu,
+            'tanggal lahir': lahir[idx],
+        }, columns=HEADER)
+
+
+def write_herd(path, n_sapi, n_hari, seed=0, **kwargs):
+    """Tulis dataset sintetis ke CSV per chunk (memori tetap kecil untuk skala penuh). Mengembalikan jumlah baris."""
+    rows = 0
+    with open(path, 'w', newline='') as f:
+        for i, chunk in enumerate(generate_herd(n_sapi, n_hari, seed=seed, **kwargs)):
+            chunk.to_csv(f, index=False, header=(i == 0))
+            rows += len(chunk)
+    return rows
@@ -2,6 +2,25 @@ import os
 
 class Config:
     SECRET_KEY = 'rahasia-upload'
-    UPLOAD_FOLDER = './'
+    UPLOAD_FOLDER = './data'            # file upload disimpan sebagai <sha1>.csv (nama dari isi file)
     ALLOWED_EXTENSIONS = {'csv'}
-    RIWAYAT_PATH = 'riwayat.csv'
+    RIWAYAT_PATH = 'riwayat.csv'        # riwayat lama (CSV), diimport sekali ke database
+    RIWAYAT_DB_PATH = 'riwayat.db'
+    PREVIEW_ROWS = 100                  # baris per halaman di /preview
+    RIWAYAT_PAGE_SIZE = 50              # jumlah baris per halaman di /analisis
+    CACHE_FOLDER = './cache'            # cache kolumnar (Arrow IPC) hasil ingest CSV, per hash isi file
+    INGEST_CHUNK_SIZE = 100_000         # baris per chunk saat membaca CSV besar
+    REGISTRY_FOLDER = './cache/registry'    # <nama dataset>.json, dibagi antar worker (models.registry)
+    DEFAULT_DATASET = 'default'
+    DATASET_MEMORY_BUDGET_MB = 1024     # batas memori konteks dataset di satu worker (models.pool)
+    DATASET_MAX_CONTEXTS = 32           # batas jumlah konteks dataset di satu worker (models.pool)
+    METRICS_ENABLED = True              # hook timing per route & span + endpoint /metrics
+    JOBS_DB_PATH = 'jobs.db'            # status job latar (upload, batch), dibaca semua worker
+    JOB_WORKERS = 2                     # thread orkestrasi job per worker
+    JOB_PROCESSES = 0                   # >0: parsing CSV di process pool (pakai core lain); 0 = di thread job
+    JOB_RESULT_FOLDER = './cache/jobs'  # hasil batch prediksi async (<id job>.json)
+    UPLOAD_SYNC_MAX_MB = 5              # upload lebih kecil dari ini langsung diproses (tanpa halaman progress)
+    MODEL_CACHE_SIZE = 256              # jumlah model jendela (per tanggal) yang disimpan di memori
+    PREDICT_BATCH_WAIT_MS = 5           # /api/predict: request bersamaan dikumpulkan selama ini lalu diprediksi sekaligus
+    PREDICT_BATCH_MAX = 256             # batas jumlah request per micro-batch
+    EXPORT_CHUNK_ROWS = 5000            # baris per chunk saat export (/export/...), dibaca/diprediksi bertahap
@@ -0,0 +1,17 @@
+class AnalysisModel:
+    """
+    Model regresi analisis riwayat (b0–b4), terpisah dari model jendela MilkPredictor.
+
+    Koefisien dihitung dari statistik cukup yang diperbarui HistoryManager setiap
+    save/delete, jadi membuka /analisis hanya butuh satu solve sistem 5×5.
+    """
+
+    def __init__(self, history_manager, dataset=None):
+        self.history_manager = history_manager
+        self.dataset = dataset
+
+    def coefficients(self):
+        coef = self.history_manager.analysis_stats(self.dataset).solve()
+        if coef is None:
+            return None
+        return {f'b{i}': float(b) for i, b in enumerate(coef)}
@@ -0,0 +1,52 @@
+import os
+import threading
+
+import numpy as np
+
+from config import Config
+
+# naikkan bila isi/arti artefak berubah: tipe data sumber (utils.ingest.CACHE_FORMAT), WINDOW_DAYS,
+# PER_SAPI_MIN_ROWS, solver regresi, definisi fitur, ... Artefak format lain dianggap belum ada.
+#   2 = dihitung dari HerdData (ukuran float32, cache format 2)
+ARTIFACT_FORMAT = 2
+
+
+class ArtifactStore:
+    """
+    Artefak turunan dataset (tanggal valid + koefisien jendela, index sapi, model per sapi)
+    sebagai file .npz di samping cache Arrow, dengan nama `<versi>.<nama>.v<ARTIFACT_FORMAT>.npz`.
+
+    Karena diberi versi (hash isi dataset + format artefak), artefak tidak pernah basi dan bisa
+    dibaca proses mana pun; worker baru cukup memuat beberapa array kecil tanpa menghitung ulang.
+    """
+
+    def __init__(self, folder=None):
+        self.folder = folder or Config.CACHE_FOLDER
+
+    def path(self, version, name):
+        return os.path.join(self.folder, f'{version}.{name}.v{ARTIFACT_FORMAT}.npz')
+
+    def exists(self, version, name):
+        return os.path.exists(self.path(version, name))
+
+    def save(self, version, name, **arrays):
+        """Tulis atomik (file sementara lalu os.replace); array object/pickle tidak didukung."""
+        path = self.path(version, name)
+        os.makedirs(self.folder, exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return path
+
+    def load(self, version, name):
+        """Dict array, atau None bila artefak belum ada."""
+        try:
+            with np.load(self.path(version, name), allow_pickle=False) as f:
+                return {k: f[k] for k in f.files}
+        except FileNotFoundError:
+            return None
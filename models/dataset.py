@@ -0,0 +1,153 @@
+import os
+import threading
+
+from models.herd import HerdData
+from utils.ingest import scan_file, cache_path, ingest_csv, read_cache
+from utils.metrics import metrics
+
+
+class DatasetStore:
+    """
+    Menyimpan dataset upload yang sudah di-parse di memori.
+
+    File hanya dibaca ulang jika mtime/ukuran berubah DAN hash isinya berbeda,
+    sehingga semua route dan MilkPredictor berbagi satu instance yang sama: `herd`
+    (models.herd.HerdData, kolumnar ringkas & read-only) untuk jalur model, dan `frame`
+    (DataFrame yang dibangun dari herd) hanya untuk route yang butuh pandas.
+    Kolom sudah bernama baku (utils.schema) dan bertipe; outlier/duplikat tidak dihapus.
+
+    Dengan `registry` (models.registry.DatasetRegistry), dataset yang dimuat worker lain
+    ikut dipakai: data dibaca dari cache Arrow yang sama lewat mmap, tanpa parse CSV.
+    Keduanya baru dibangun saat pertama diakses, jadi request yang cukup dilayani artefak
+    (models.artifacts) pada worker baru tidak perlu menyentuh data mentah.
+    """
+
+    def __init__(self, path=None, registry=None):
+        self.registry = registry
+        self.path = None
+        self._herd = None
+        self._frame = None
+        self.version = None
+        self.cache_path = None
+        self._stat = None
+        self._lock = threading.RLock()
+        if path:
+            self.load(path)
+
+    @metrics.timed('dataset.load')
+    def load(self, path, scanned=None):
+        """
+        Muat (ulang) dataset dari path lewat cache kolumnar (utils.ingest). CSV hanya
+        di-parse (streaming per chunk) bila cache untuk hash isinya belum ada.
+        `scanned` = hasil scan_file(path) bila sudah dihitung pemanggil.
+        Melempar utils.schema.MissingColumnsError jika kolom wajib tidak ada;
+        dataset aktif sebelumnya tidak berubah bila gagal.
+        """
+        with self._lock:
+            stat = os.stat(path)
+            version, encoding = scanned or scan_file(path)
+            cache = cache_path(version)
+            if not os.path.exists(cache):
+                ingest_csv(path, encoding, cache)
+            self._attach(path, version, cache, (stat.st_mtime_ns, stat.st_size))
+            if self.registry is not None:
+                self.registry.publish(path, version, cache)
+            return self.herd
+
+    def _attach(self, path, version, cache, stat):
+        self._herd = None
+        self._frame = None
+        self.version = version
+        self.path = path
+        self.cache_path = cache
+        self._stat = stat
+
+    def sync(self):
+        """Ikuti dataset aktif di registry bila versinya berbeda dari yang dimuat proses ini."""
+        if self.registry is None:
+            return False
+        entry = self.registry.read()
+        if not entry or entry['version'] == self.version:
+            return False
+        with self._lock:
+            if entry['version'] == self.version:
+                return False
+            if os.path.exists(entry['cache_path']):
+                try:
+                    stat = os.stat(entry['path'])
+                    stat = (stat.st_mtime_ns, stat.st_size)
+                except FileNotFoundError:
+                    stat = None
+                self._attach(entry['path'], entry['version'], entry['cache_path'], stat)
+            elif os.path.exists(entry['path']):
+                # cache terhapus: parse ulang sekali, cache & registry ditulis lagi
+                self.load(entry['path'])
+            else:
+                return False
+            return True
+
+    def refresh(self):
+        """Cek perubahan file; parse ulang hanya bila isi file benar-benar berubah."""
+        with self._lock:
+            if not self.path or not os.path.exists(self.path):
+                return False
+            stat = os.stat(self.path)
+            if (stat.st_mtime_ns, stat.st_size) == self._stat:
+                return False
+
+            version, _ = scan_file(self.path)
+            if version == self.version:
+                # hanya mtime yang berubah (mis. di-touch), isi sama
+                self._stat = (stat.st_mtime_ns, stat.st_size)
+                return False
+
+            self.load(self.path)
+            return True
+
+    @property
+    def herd(self):
+        if self._herd is None and self.cache_path is not None:
+            with self._lock:
+                if self._herd is None:
+                    self._herd = HerdData.from_arrow(read_cache(self.cache_path))
+        return self._herd
+
+    @property
+    def frame(self):
+        if self._frame is None and self.cache_path is not None:
+            herd = self.herd
+            with self._lock:
+                if self._frame is None:
+                    self._frame = herd.to_pandas()
+        return self._frame
+
+    def is_loaded(self):
+        return self._herd is not None
+
+    def memory_bytes(self):
+        """Perkiraan memori data yang sudah dibangun (herd + frame pandas bila ada)."""
+        total = self._herd.nbytes() if self._herd is not None else 0
+        if self._frame is not None:
+            total += int(self._frame.memory_usage(deep=False).sum())
+        return total
+
+    def exists(self):
+        self.sync()
+        return self.version is not None
+
+    def current_version(self):
+        """Versi dataset terbaru (ikut registry & cek perubahan file) tanpa membangun frame."""
+        if not self.exists():
+            raise FileNotFoundError("Dataset belum diunggah.")
+        self.refresh()
+        return self.version
+
+    def get(self):
+        """Kembalikan frame pandas bersama (read-only: kolom ukuran menunjuk langsung ke cache mmap)."""
+        self.current_version()
+        return self.frame
+
+    def get_herd(self):
+        """Kembalikan HerdData bersama (tanpa membangun DataFrame)."""
+        self.current_version()
+        return self.herd
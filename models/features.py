@@ -0,0 +1,166 @@
+import hashlib
+import threading
+
+import numpy as np
+
+from models.artifacts import ArtifactStore
+from models.predictor import TANGGAL_COL, TARGET_COL, _kode_key
+from utils.metrics import metrics
+
+# fitur deret waktu per sapi: produksi hari sebelumnya & rata-rata 7/14 hari sebelumnya
+# (jendela waktu [t - n hari, t), hari ini tidak ikut), plus rasio pakan/produksi hari ini
+JENDELA = {'produksi_lag_1': 1, 'produksi_rata_7': 7, 'produksi_rata_14': 14}
+FITUR_WAKTU = list(JENDELA) + ['rasio_pakan_produksi']
+HARIAN_COLS = ['tanggal', 'kode_sapi', 'produksi', 'pakan']
+# riwayat yang perlu ikut dihitung ulang saat menambah hari baru
+EKOR_HARI = max(JENDELA.values())
+
+
+def harian(herd, mulai=0):
+    """
+    Satu baris per (hari, kode sapi) dari models.herd.HerdData: rata-rata produksi harian & pakan,
+    urut tanggal lalu kode. Urutan ini membuat hari baru cukup ditambahkan di ujung (lihat tambah_hari).
+    `mulai`: hanya baris herd mulai indeks ini (baris yang ditambahkan sesudah versi sebelumnya).
+    """
+    import pandas as pd
+
+    mask = herd.lengkap([TANGGAL_COL, 'kode_sapi'])
+    mask[:mulai] = False
+    data = pd.DataFrame({
+        'tanggal': herd.tanggal(TANGGAL_COL)[mask].astype('datetime64[ns]'),
+        'kode_sapi': _kode_key(herd.kategori)[herd.kode[mask]].astype(object),
+        'produksi': herd.ukuran[TARGET_COL][mask].astype(np.float64),
+        'pakan': herd.ukuran['jumlah_pakan_kg'][mask].astype(np.float64),
+    })
+    return data.groupby(['tanggal', 'kode_sapi'], sort=True)[['produksi', 'pakan']].mean().reset_index()
+
+
+def hitung_fitur(daily):
+    """Fitur per sapi lewat groupby-rolling berbasis waktu (tervektorisasi untuk semua sapi)."""
+    out = daily[HARIAN_COLS].reset_index(drop=True)
+    per_sapi = out.groupby('kode_sapi', sort=False)[['tanggal', 'produksi']]
+    for nama, hari in JENDELA.items():
+        rata = per_sapi.rolling(f'{hari}D', on='tanggal', closed='left').mean()['produksi']
+        # index (kode sapi, posisi baris asli) -> sejajarkan kembali ke urutan tanggal
+        out[nama] = rata.droplevel(0)
+    out['rasio_pakan_produksi'] = out['pakan'] / out['produksi'].where(out['produksi'] > 0)
+    return out
+
+
+def tambah_hari(fitur, baru):
+    """
+    Tambahkan hari baru (sesudah tanggal terakhir `fitur`) tanpa menghitung ulang seluruh riwayat:
+    hanya EKOR_HARI terakhir sapi yang bersangkutan ikut dihitung bersama baris baru.
+    """
+    import pandas as pd
+
+    if baru.empty:
+        return fitur
+    # fitur urut tanggal: ekor riwayat cukup dipotong lewat searchsorted
+    awal = fitur['tanggal'].searchsorted(baru['tanggal'].min() - pd.Timedelta(days=EKOR_HARI))
+    ekor = fitur.iloc[awal:]
+    ekor = ekor.loc[ekor['kode_sapi'].isin(baru['kode_sapi'].unique()), HARIAN_COLS]
+    hasil = hitung_fitur(pd.concat([ekor, baru[HARIAN_COLS]], ignore_index=True)).iloc[len(ekor):]
+    return pd.concat([fitur, hasil], ignore_index=True)
+
+
+def sidik(herd, n):
+    """
+    Sidik n baris pertama herd (kolom yang dipakai harian): sama berarti riwayat lama tidak
+    berubah dan versi baru cukup diproses dari baris ke-n. Hanya hash byte kolom, tanpa groupby.
+    """
+    h = hashlib.sha1()
+    kode = herd.kode[:n]
+    # kode sapi disimpan sebagai indeks kategori (urutan kemunculan): kategori terpakai ikut di-hash
+    k = int(kode.max()) + 1 if n else 0
+    h.update('\0'.join(herd.kategori[:k].tolist()).encode('utf-8'))
+    for arr in (kode, herd.hari[TANGGAL_COL][:n], herd.ukuran[TARGET_COL][:n],
+                herd.ukuran['jumlah_pakan_kg'][:n]):
+        h.update(np.ascontiguousarray(arr))
+    return h.hexdigest()
+
+
+class FeatureStore:
+    """
+    Fitur deret waktu per sapi untuk satu dataset, di-cache per versi (memori + artefak .npz).
+
+    Dataset versi baru yang hanya menambah hari di ujung riwayat (mis. upload ulang dengan
+    data hari ini) diperbarui lewat tambah_hari, bukan dihitung ulang dari awal.
+    """
+
+    def __init__(self, dataset, artifacts=None):
+        self.dataset = dataset
+        self.artifacts = artifacts or ArtifactStore()
+        self._lock = threading.Lock()
+        # (versi dataset, DataFrame fitur, (jumlah baris herd, sidik) atau None)
+        self._cache = None
+
+    @metrics.timed('features.get')
+    def get(self):
+        version = self.dataset.current_version()
+        if self._cache is not None and self._cache[0] == version:
+            return self._cache[1]
+        with self._lock:
+            if self._cache is not None and self._cache[0] == version:
+                return self._cache[1]
+            art = self.artifacts.load(version, 'fitur')
+            if art is not None:
+                fitur, riwayat = self._dari_arrays(art)
+            else:
+                herd = self.dataset.get_herd()
+                fitur = self._hitung(herd)
+                riwayat = (len(herd), sidik(herd, len(herd)))
+                self.artifacts.save(version, 'fitur', **self._ke_arrays(fitur, riwayat))
+            self._cache = (version, fitur, riwayat)
+        return fitur
+
+    def _hitung(self, herd):
+        """
+        Versi baru yang hanya menambah baris di ujung herd dengan tanggal sesudah riwayat lama:
+        cukup baris baru yang dikelompokkan, lalu tambah_hari. Selain itu dihitung ulang penuh.
+        """
+        if self._cache is not None and self._cache[2] is not None and len(self._cache[1]):
+            fitur, (n, lama) = self._cache[1], self._cache[2]
+            if len(herd) >= n and sidik(herd, n) == lama:
+                baru = harian(herd, mulai=n)
+                if baru.empty or baru['tanggal'].iloc[0] > fitur['tanggal'].iloc[-1]:
+                    return tambah_hari(fitur, baru)
+        return hitung_fitur(harian(herd))
+
+    def memory_bytes(self):
+        cache = self._cache
+        return int(cache[1].memory_usage(deep=False).sum()) if cache is not None else 0
+
+    def query(self, kode_sapi=None, dari=None, sampai=None):
+        """Potongan fitur (semua sapi atau satu kode sapi) dalam rentang tanggal, urut tanggal."""
+        import pandas as pd
+
+        fitur = self.get()
+        mask = np.ones(len(fitur), dtype=bool)
+        if kode_sapi:
+            mask &= fitur['kode_sapi'].to_numpy() == _kode_key([kode_sapi])[0]
+        if dari:
+            mask &= (fitur['tanggal'] >= pd.Timestamp(dari)).to_numpy()
+        if sampai:
+            mask &= (fitur['tanggal'] <= pd.Timestamp(sampai)).to_numpy()
+        return fitur[mask]
+
+    @staticmethod
+    def _ke_arrays(fitur, riwayat):
+        arrays = {c: fitur[c].to_numpy(dtype=float) for c in ['produksi', 'pakan'] + FITUR_WAKTU}
+        arrays['tanggal'] = fitur['tanggal'].to_numpy(dtype='datetime64[ns]')
+        arrays['kode_sapi'] = fitur['kode_sapi'].to_numpy(dtype=str)
+        arrays['riwayat_baris'] = np.int64(riwayat[0])
+        arrays['riwayat_sidik'] = np.str_(riwayat[1])
+        return arrays
+
+    @staticmethod
+    def _dari_arrays(arrays):
+        import pandas as pd
+
+        fitur = pd.DataFrame({c: arrays[c] for c in HARIAN_COLS + FITUR_WAKTU})
+        fitur['kode_sapi'] = fitur['kode_sapi'].astype(object)
+        riwayat = None
+        if 'riwayat_sidik' in arrays:
+            riwayat = (int(arrays['riwayat_baris']), str(arrays['riwayat_sidik']))
+        return fitur, riwayat
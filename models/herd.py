@@ -0,0 +1,124 @@
+import numpy as np
+
+# penanda tanggal kosong pada kolom hari (int32)
+HARI_KOSONG = np.iinfo(np.int32).min
+# digit signifikan yang dijamin float32; angka dari CSV dikembalikan ke nilai desimal ini saat ditampilkan
+DIGIT_FLOAT32 = 7
+
+
+def ke_float64(values):
+    """
+    Nilai ukuran float32 -> float64 dengan nilai desimal aslinya (6.6, bukan 6.599999904632568),
+    dibulatkan ke DIGIT_FLOAT32 digit signifikan. Dipakai di batas keluaran (JSON, riwayat),
+    bukan di perhitungan model.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        skala = 10.0 ** (DIGIT_FLOAT32 - 1 - np.floor(np.log10(np.abs(x))))
+        out = np.rint(x * skala) / skala
+    return np.where(np.isfinite(out), out, x)
+
+
+class HerdData:
+    """
+    Representasi kolumnar ringkas dataset, dibagi (read-only) oleh semua pemakai satu DatasetStore.
+
+    - kode sapi: kode int32 (`kode`, -1 = kosong) + tabel `kategori` berisi kode sapi unik
+    - tanggal  : int32 jumlah hari sejak 1970-01-01 (`hari[kolom]`, HARI_KOSONG = kosong)
+    - ukuran   : float32 (`ukuran[kolom]`, NaN = kosong)
+
+    Dibangun dari cache Arrow (utils.ingest) tanpa salinan bila kolom tidak punya null:
+    array numpy menunjuk langsung ke halaman file yang di-mmap. DataFrame pandas hanya
+    dibentuk lewat to_pandas() untuk route yang memang butuh (preview, batch).
+    """
+
+    def __init__(self, columns, kode, kategori, hari, ukuran):
+        self.columns = list(columns)
+        self.kode = kode
+        self.kategori = kategori
+        self.hari = hari
+        self.ukuran = ukuran
+
+    @classmethod
+    def from_arrow(cls, table):
+        import pyarrow as pa
+
+        kode, kategori, hari, ukuran = None, np.array([], dtype=str), {}, {}
+        for field in table.schema:
+            arr = table.column(field.name).combine_chunks()
+            if pa.types.is_dictionary(field.type):
+                indices = arr.indices if arr.null_count == 0 else arr.indices.fill_null(-1)
+                kode = indices.to_numpy()
+                kategori = arr.dictionary.to_numpy(zero_copy_only=False).astype(str)
+            elif pa.types.is_date32(field.type):
+                # date32 = int32 hari sejak epoch, cast tanpa salinan
+                arr = arr.cast(pa.int32())
+                hari[field.name] = (arr if arr.null_count == 0 else arr.fill_null(HARI_KOSONG)).to_numpy()
+            else:
+                ukuran[field.name] = arr.to_numpy(zero_copy_only=False)
+        if kode is None:
+            kode = np.full(table.num_rows, -1, dtype=np.int32)
+        return cls(table.column_names, kode, kategori, hari, ukuran)
+
+    def __len__(self):
+        return len(self.kode)
+
+    def nbytes(self):
+        return (self.kode.nbytes + self.kategori.nbytes + sum(a.nbytes for a in self.hari.values())
+                + sum(a.nbytes for a in self.ukuran.values()))
+
+    def lengkap(self, columns):
+        """Mask baris yang semua kolomnya terisi (setara dropna(subset=columns))."""
+        mask = np.ones(len(self), dtype=bool)
+        for c in columns:
+            if c == 'kode_sapi':
+                mask &= self.kode >= 0
+            elif c in self.hari:
+                mask &= self.hari[c] != HARI_KOSONG
+            else:
+                mask &= ~np.isnan(self.ukuran[c])
+        return mask
+
+    def matrix(self, columns, mask=None):
+        """Kolom ukuran sebagai matriks float64 (untuk regresi), opsional hanya baris `mask`."""
+        cols = [self.ukuran[c] if mask is None else self.ukuran[c][mask] for c in columns]
+        return np.column_stack(cols).astype(np.float64) if cols else np.empty((len(self), 0))
+
+    def tanggal(self, column):
+        """Kolom tanggal sebagai datetime64[D] (NaT bila kosong)."""
+        hari = self.hari[column]
+        out = hari.astype('datetime64[D]')
+        out[hari == HARI_KOSONG] = np.datetime64('NaT')
+        return out
+
+    def rata_per_kode(self, column, kunci=None):
+        """
+        Rata-rata kolom ukuran per kode sapi (NaN diabaikan): {kode sapi: rata-rata}.
+        `kunci`: kunci per entri kategori (mis. kode ternormalisasi); kategori dengan kunci sama digabung.
+        """
+        nilai = ke_float64(self.ukuran[column])
+        ok = (self.kode >= 0) & ~np.isnan(nilai)
+        if kunci is None:
+            label, grup = self.kategori, self.kode[ok]
+        else:
+            label, per_kategori = np.unique(np.asarray(kunci), return_inverse=True)
+            grup = per_kategori[self.kode[ok]]
+        n = np.bincount(grup, minlength=len(label))
+        total = np.bincount(grup, weights=nilai[ok], minlength=len(label))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rata = total / n
+        return dict(zip(label.tolist(), rata.tolist()))
+
+    def to_pandas(self):
+        """DataFrame dengan kode sapi categorical, tanggal datetime64 dan ukuran float32 (view read-only)."""
+        import pandas as pd
+
+        data = {}
+        for c in self.columns:
+            if c == 'kode_sapi':
+                data[c] = pd.Categorical.from_codes(self.kode, self.kategori.astype(object))
+            elif c in self.hari:
+                data[c] = self.tanggal(c).astype('datetime64[ns]')
+            else:
+                data[c] = self.ukuran[c]
+        return pd.DataFrame(data, copy=False)
@@ -1,23 +1,366 @@
-import pandas as pd
+import json
 import os
+import sqlite3
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
 from config import Config
+from models.regression import RunningLeastSquares
+from utils.metrics import metrics
+from utils.validator import ke_kode, teks_rekomendasi
+
+# (nama kolom tampilan/CSV lama, nama kolom di tabel)
+COLUMNS = [
+    ('Tanggal Pemerahan', 'tanggal_pemerahan'),
+    ('Kode Sapi', 'kode_sapi'),
+    ('Jumlah Pakan', 'jumlah_pakan'),
+    ('Suhu', 'suhu'),
+    ('Umur', 'umur'),
+    ('Berat Badan', 'berat_badan'),
+    ('Produksi Susu', 'produksi_susu'),
+    ('Rekomendasi', 'rekomendasi'),
+]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS riwayat (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dataset TEXT NOT NULL DEFAULT '{Config.DEFAULT_DATASET}',
+    tanggal_pemerahan TEXT NOT NULL,
+    kode_sapi TEXT NOT NULL,
+    jumlah_pakan REAL,
+    suhu REAL,
+    umur REAL,
+    berat_badan REAL,
+    produksi_susu REAL,
+    rekomendasi TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# statistik cukup regresi analisis (XᵀX, Xᵀy, n) per dataset, diperbarui di transaksi yang sama dengan insert/delete
+STATS_TABLE = """
+CREATE TABLE IF NOT EXISTS analisis_stats (
+    dataset TEXT PRIMARY KEY,
+    n INTEGER NOT NULL,
+    xtx TEXT NOT NULL,
+    xty TEXT NOT NULL
+)
+"""
+
+# semua query difilter per dataset; rowid (id) ikut tersimpan di index,
+# jadi ORDER BY tanggal DESC, id DESC bisa langsung dari index
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_riwayat_dataset ON riwayat (dataset, tanggal_pemerahan)",
+    "CREATE INDEX IF NOT EXISTS idx_riwayat_dataset_kode ON riwayat (dataset, kode_sapi, tanggal_pemerahan)",
+]
+
+# versi skema (PRAGMA user_version)
+#   1 = rekomendasi disimpan sebagai JSON array
+#   2 = tabel analisis_stats diisi dari riwayat yang sudah ada
+#   3 = riwayat & analisis_stats dipartisi per dataset (peternakan)
+#   4 = rekomendasi disimpan sebagai kode (utils.validator), teks dibentuk saat dibaca
+SCHEMA_VERSION = 4
+
+# kolom regresi analisis: Produksi Susu ~ Jumlah Pakan + Suhu + Umur + Berat Badan
+ANALISIS_COLS = ['jumlah_pakan', 'suhu', 'umur', 'berat_badan', 'produksi_susu']
+
+
+def _to_sql_value(value):
+    # numpy scalar -> python scalar, NaN -> NULL
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def encode_rekomendasi(value):
+    """
+    Simpan rekomendasi sebagai JSON array kode (mis. ["S2","P9","U3","B1"]); teks yang dikenal
+    diubah ke kodenya, string lama 'a | b' dipecah sekali di sini.
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return json.dumps([])
+    if isinstance(value, str):
+        value = [v for v in value.split(' | ') if v]
+    return json.dumps(ke_kode(value), ensure_ascii=False)
+
+
+def decode_rekomendasi(value):
+    """JSON array kode -> list teks untuk ditampilkan."""
+    if not value:
+        return []
+    return teks_rekomendasi(json.loads(value))
+
+
+@lru_cache(maxsize=4096)
+def _teks_gabung(value):
+    # kombinasi kode rekomendasi sedikit: decode JSON & susun teks cukup sekali per nilai
+    return ' | '.join(decode_rekomendasi(value))
+
 
 class HistoryManager:
-    def __init__(self):
-        self.path = Config.RIWAYAT_PATH
+    """Riwayat prediksi di SQLite (WAL): insert append-only, id baris stabil, aman untuk banyak worker."""
+
+    def __init__(self, path=None, csv_path=None):
+        self.path = path or Config.RIWAYAT_DB_PATH
+        self.csv_path = csv_path or Config.RIWAYAT_PATH
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            conn.execute(STATS_TABLE)
+        self._migrate()
+        self.import_csv(self.csv_path)
+
+    def _migrate(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < 3:
+                self._partition_tables(conn)
+            if version < 1:
+                # rekomendasi lama berupa string 'a | b | c' -> JSON array
+                rows = conn.execute("SELECT id, rekomendasi FROM riwayat").fetchall()
+                conn.executemany("UPDATE riwayat SET rekomendasi = ? WHERE id = ?",
+                                 [(encode_rekomendasi(r), i) for i, r in rows])
+            if version < 3:
+                self._rebuild_stats(conn)
+            if 1 <= version < 4:
+                # teks rekomendasi (JSON array) -> kode
+                rows = conn.execute("SELECT id, rekomendasi FROM riwayat").fetchall()
+                conn.executemany("UPDATE riwayat SET rekomendasi = ? WHERE id = ?",
+                                 [(encode_rekomendasi(json.loads(r) if r else None), i) for i, r in rows])
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @staticmethod
+    def _partition_tables(conn):
+        # database lama: semua riwayat masuk dataset default, statistik dibuat ulang per dataset
+        if 'dataset' not in {r[1] for r in conn.execute("PRAGMA table_info(riwayat)")}:
+            conn.execute("ALTER TABLE riwayat ADD COLUMN dataset TEXT NOT NULL "
+                         f"DEFAULT '{Config.DEFAULT_DATASET}'")
+        if 'dataset' not in {r[1] for r in conn.execute("PRAGMA table_info(analisis_stats)")}:
+            conn.execute("DROP TABLE analisis_stats")
+            conn.execute(STATS_TABLE)
+        conn.execute("DROP INDEX IF EXISTS idx_riwayat_tanggal")
+        conn.execute("DROP INDEX IF EXISTS idx_riwayat_kode")
+        for stmt in INDEXES:
+            conn.execute(stmt)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:  # commit / rollback otomatis
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_values(data):
+        values = [_to_sql_value(data.get(display)) for display, _ in COLUMNS[:-1]]
+        values.append(encode_rekomendasi(data.get('Rekomendasi')))
+        return tuple(values)
 
-    def load(self):
-        if not os.path.exists(self.path):
+    def import_csv(self, csv_path):
+        """Import satu kali riwayat.csv lama ke database. Mengembalikan jumlah baris yang diimport."""
+        if not csv_path or not os.path.exists(csv_path):
+            return 0
+        with self._connect() as conn:
+            # BEGIN IMMEDIATE supaya dua worker tidak mengimport bersamaan
+            conn.execute("BEGIN IMMEDIATE")
+            done = conn.execute("SELECT value FROM meta WHERE key = 'csv_imported'").fetchone()
+            if done:
+                return 0
+            import pandas as pd
+            df = pd.read_csv(csv_path)
+            rows = [self._row_values(r) for r in df.to_dict(orient='records')]
+            self._insert(conn, rows)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('csv_imported', ?)", (os.path.abspath(csv_path),))
+            return len(rows)
+
+    @classmethod
+    def _insert(cls, conn, rows, dataset=None):
+        dataset = dataset or Config.DEFAULT_DATASET
+        cols = ', '.join(['dataset'] + [col for _, col in COLUMNS])
+        marks = ', '.join('?' for _ in range(len(COLUMNS) + 1))
+        conn.executemany(f"INSERT INTO riwayat ({cols}) VALUES ({marks})", [(dataset,) + r for r in rows])
+        idx = [col for _, col in COLUMNS].index
+        cls._update_stats(conn, dataset, [[r[idx(c)] for c in ANALISIS_COLS] for r in rows], tambah=True)
+
+    # --- statistik regresi analisis (per dataset) ---
+
+    @staticmethod
+    def _read_stats(conn, dataset):
+        stats = RunningLeastSquares(len(ANALISIS_COLS) - 1)
+        row = conn.execute("SELECT n, xtx, xty FROM analisis_stats WHERE dataset = ?", (dataset,)).fetchone()
+        if row:
+            stats.n = row[0]
+            stats.xtx = np.array(json.loads(row[1]), dtype=float)
+            stats.xty = np.array(json.loads(row[2]), dtype=float)
+        return stats
+
+    @staticmethod
+    def _write_stats(conn, dataset, stats):
+        conn.execute("INSERT OR REPLACE INTO analisis_stats (dataset, n, xtx, xty) VALUES (?, ?, ?, ?)",
+                     (dataset, int(stats.n), json.dumps(stats.xtx.tolist()), json.dumps(stats.xty.tolist())))
+
+    @classmethod
+    def _update_stats(cls, conn, dataset, values, tambah):
+        # hanya baris dengan semua nilai numerik lengkap yang ikut regresi
+        data = np.array(values, dtype=float).reshape(-1, len(ANALISIS_COLS))
+        data = data[~np.isnan(data).any(axis=1)]
+        if not len(data):
+            return
+        stats = cls._read_stats(conn, dataset)
+        if tambah:
+            stats.add(data[:, :-1], data[:, -1])
+        else:
+            stats.remove(data[:, :-1], data[:, -1])
+        cls._write_stats(conn, dataset, stats)
+
+    @classmethod
+    def _rebuild_stats(cls, conn):
+        conn.execute("DELETE FROM analisis_stats")
+        datasets = [r[0] for r in conn.execute("SELECT DISTINCT dataset FROM riwayat")]
+        for dataset in datasets:
+            rows = conn.execute(f"SELECT {', '.join(ANALISIS_COLS)} FROM riwayat WHERE dataset = ?",
+                                (dataset,)).fetchall()
+            cls._update_stats(conn, dataset, rows, tambah=True)
+
+    def rebuild_stats(self):
+        """Hitung ulang statistik analisis dari seluruh riwayat (mis. untuk membuang galat pembulatan)."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._rebuild_stats(conn)
+
+    @metrics.timed('history.analysis_stats')
+    def analysis_stats(self, dataset=None):
+        """Statistik cukup (XᵀX, Xᵀy, n) regresi analisis riwayat satu dataset."""
+        with self._connect() as conn:
+            return self._read_stats(conn, dataset or Config.DEFAULT_DATASET)
+
+    @metrics.timed('history.load')
+    def load(self, dataset=None):
+        import pandas as pd
+        with self._connect() as conn:
+            df = pd.read_sql_query(f"SELECT {self._select_cols()} FROM riwayat WHERE dataset = ? ORDER BY id",
+                                   conn, params=(dataset or Config.DEFAULT_DATASET,))
+        if df.empty:
             return pd.DataFrame()
-        return pd.read_csv(self.path)
-
-    def save(self, data):
-        df = self.load()
-        df = pd.concat([df, pd.DataFrame([data])], ignore_index=True)
-        df.to_csv(self.path, index=False)
-
-    def delete(self, index):
-        df = self.load()
-        if 0 <= index < len(df):
-            df = df.drop(index).reset_index(drop=True)
-            df.to_csv(self.path, index=False)
+        df['Rekomendasi'] = df['Rekomendasi'].map(decode_rekomendasi)
+        return df
+
+    @staticmethod
+    def _select_cols():
+        return ', '.join(['id'] + [f'{col} AS "{display}"' for display, col in COLUMNS])
+
+    @metrics.timed('history.query')
+    def query(self, dataset=None, kode_sapi=None, dari=None, sampai=None, sebelum=None, limit=None):
+        """
+        Satu halaman riwayat satu dataset (terbaru dulu) dengan filter kode sapi & rentang tanggal.
+
+        Memakai keyset pagination: `sebelum` = (tanggal, id) baris terakhir halaman
+        sebelumnya, sehingga biaya per halaman tidak bergantung pada besar tabel.
+        Mengembalikan (rows, cursor_berikutnya atau None).
+        """
+        limit = Config.RIWAYAT_PAGE_SIZE if limit is None else limit
+        if limit < 1:
+            raise ValueError("limit harus minimal 1.")
+        where, params = self._filters(dataset, kode_sapi, dari, sampai)
+        if sebelum:
+            where.append("(tanggal_pemerahan, id) < (?, ?)")
+            params.extend([sebelum[0], int(sebelum[1])])
+
+        sql = f"SELECT {self._select_cols()} FROM riwayat WHERE " + " AND ".join(where)
+        sql += " ORDER BY tanggal_pemerahan DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+        cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            cursor = (rows[-1]['Tanggal Pemerahan'], rows[-1]['id'])
+        for r in rows:
+            r['Rekomendasi'] = decode_rekomendasi(r['Rekomendasi'])
+        return rows, cursor
+
+    @staticmethod
+    def _filters(dataset, kode_sapi, dari, sampai):
+        where, params = ["dataset = ?"], [dataset or Config.DEFAULT_DATASET]
+        if kode_sapi:
+            where.append("kode_sapi = ?")
+            params.append(str(kode_sapi))
+        if dari:
+            where.append("tanggal_pemerahan >= ?")
+            params.append(str(dari))
+        if sampai:
+            where.append("tanggal_pemerahan <= ?")
+            params.append(str(sampai))
+        return where, params
+
+    def iter_pages(self, **filters):
+        """Generator semua halaman hasil query (dipakai untuk streaming)."""
+        cursor = None
+        while True:
+            rows, cursor = self.query(sebelum=cursor, **filters)
+            if rows:
+                yield rows
+            if cursor is None:
+                return
+
+    def iter_rows(self, dataset=None, kode_sapi=None, dari=None, sampai=None, limit=None):
+        """
+        Baris riwayat per chunk untuk export, urut id (urutan simpan): tuple urut COLUMNS dengan
+        rekomendasi (teks) digabung ' | ' seperti riwayat.csv lama, sehingga hasil export CSV
+        bisa diimport kembali. Tiap chunk dibaca dengan koneksi baru (keyset id > terakhir),
+        jadi tidak ada transaksi baca panjang yang menahan checkpoint WAL selama unduhan.
+        """
+        limit = Config.EXPORT_CHUNK_ROWS if limit is None else limit
+        if limit < 1:
+            raise ValueError("limit harus minimal 1.")
+        where, params = self._filters(dataset, kode_sapi, dari, sampai)
+        if not kode_sapi:
+            # '+dataset': jangan pakai index dataset (butuh sort id per chunk), scan rowid > terakhir saja
+            where[0] = "+dataset = ?"
+        cols = ', '.join(col for _, col in COLUMNS)
+        sql = f"SELECT id, {cols} FROM riwayat WHERE {' AND '.join(where)} AND id > ? ORDER BY id LIMIT ?"
+        terakhir = 0
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(sql, params + [terakhir, limit]).fetchall()
+            if not rows:
+                return
+            terakhir = rows[-1][0]
+            yield [r[1:-1] + (_teks_gabung(r[-1]),) for r in rows]
+            if len(rows) < limit:
+                return
+
+    def save(self, data, dataset=None):
+        self.save_many([data], dataset)
+
+    @metrics.timed('history.save_many')
+    def save_many(self, records, dataset=None):
+        """Simpan banyak baris sekaligus dalam satu transaksi."""
+        if not records:
+            return
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._insert(conn, [self._row_values(r) for r in records], dataset)
+
+    @metrics.timed('history.delete')
+    def delete(self, row_id, dataset=None):
+        """Hapus satu baris riwayat; hanya jika baris itu milik `dataset`."""
+        dataset = dataset or Config.DEFAULT_DATASET
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(f"DELETE FROM riwayat WHERE id = ? AND dataset = ? "
+                                f"RETURNING {', '.join(ANALISIS_COLS)}", (row_id, dataset)).fetchall()
+            self._update_stats(conn, dataset, rows, tambah=False)
@@ -0,0 +1,167 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+
+from config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    jenis TEXT NOT NULL,
+    dataset TEXT,
+    status TEXT NOT NULL,          -- antri | berjalan | selesai | gagal
+    progress REAL NOT NULL DEFAULT 0,
+    pesan TEXT,
+    hasil TEXT,                    -- JSON
+    host TEXT,
+    pid INTEGER,
+    dibuat REAL NOT NULL,
+    diperbarui REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_dibuat ON jobs (dibuat);
+"""
+
+AKTIF = ('antri', 'berjalan')
+
+
+class JobHandle:
+    """Diberikan ke fungsi job: id job & pelaporan progress."""
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.id = job_id
+
+    def progress(self, fraksi, pesan=None):
+        fields = {'progress': min(max(float(fraksi), 0.0), 1.0)}
+        if pesan is not None:
+            fields['pesan'] = pesan
+        self.queue._update(self.id, **fields)
+
+
+def _pid_hidup(pid):
+    if os.name != 'posix':
+        return True     # tidak bisa dicek dengan aman (os.kill di Windows menghentikan proses)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    Antrian job lokal: thread pool untuk orkestrasi + process pool opsional untuk kerja CPU berat.
+
+    Status & progress disimpan di tabel SQLite (bisa dibaca semua worker), jadi request cukup
+    mengembalikan id job lalu UI mem-poll status. Fungsi job dipanggil sebagai
+    `fn(job, *args)` (job: JobHandle, lapor lewat `job.progress(fraksi, pesan)`);
+    nilai kembaliannya (dict kecil) disimpan sebagai hasil JSON.
+    """
+
+    def __init__(self, path=None, max_workers=None, processes=None):
+        self.path = path or Config.JOBS_DB_PATH
+        self.max_workers = max_workers or Config.JOB_WORKERS
+        self.processes = Config.JOB_PROCESSES if processes is None else processes
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='job')
+        self._process_pool = None
+        self._futures = {}      # id job -> Future, hanya untuk job di proses ini
+        self._lock = threading.Lock()
+        self.host = socket.gethostname()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        self._tandai_terputus()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _tandai_terputus(self):
+        # job di host ini yang prosesnya sudah mati (mis. worker restart) tidak akan pernah selesai
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT id, pid FROM jobs WHERE host = ? AND status IN {AKTIF}",
+                                (self.host,)).fetchall()
+            mati = [(time.time(), job_id) for job_id, pid in rows if not _pid_hidup(pid)]
+            conn.executemany("UPDATE jobs SET status = 'gagal', pesan = 'Terputus (worker berhenti).', "
+                             "diperbarui = ? WHERE id = ?", mati)
+
+    def _update(self, job_id, **fields):
+        fields['diperbarui'] = time.time()
+        cols = ', '.join(f'{k} = ?' for k in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+    def submit(self, jenis, fn, *args, dataset=None):
+        """Daftarkan job lalu jalankan di thread pool. Mengembalikan id job."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT INTO jobs (id, jenis, dataset, status, host, pid, dibuat, diperbarui) "
+                         "VALUES (?, ?, ?, 'antri', ?, ?, ?, ?)",
+                         (job_id, jenis, dataset, self.host, os.getpid(), now, now))
+        future = self._executor.submit(self._run, job_id, fn, args)
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+        return job_id
+
+    def _forget(self, job_id):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def _run(self, job_id, fn, args):
+        self._update(job_id, status='berjalan')
+        try:
+            hasil = fn(JobHandle(self, job_id), *args)
+        except Exception as e:
+            self._update(job_id, status='gagal', pesan=str(e))
+            return None
+        self._update(job_id, status='selesai', progress=1.0, pesan='Selesai.',
+                     hasil=json.dumps(hasil, ensure_ascii=False, default=str))
+        return hasil
+
+    def wait(self, job_id, timeout=None):
+        """Tunggu job di proses ini selesai (untuk upload kecil / klien yang minta sinkron)."""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout)
+        return self.get(job_id)
+
+    def run_cpu(self, fn, *args):
+        """Jalankan fungsi top-level (picklable) di process pool supaya kerja CPU tersebar ke core lain."""
+        if not self.processes:
+            return fn(*args)
+        with self._lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(self.processes)
+        return self._process_pool.submit(fn, *args).result()
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['hasil'] = json.loads(job['hasil']) if job['hasil'] else None
+        return job
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait)
@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+
+
+class DatasetPool:
+    """
+    Konteks per dataset (dataset, predictor, index sapi, cache preview) dengan urutan LRU.
+
+    Konteks dibuat lewat `factory(nama)` saat pertama diminta. Bila total memori
+    (`ctx.memory_bytes()`) melebihi `budget_bytes` atau jumlah konteks melebihi
+    `max_contexts` (konteks yang belum memuat data tercatat 0 byte), konteks yang paling
+    lama tidak dipakai dilepas (`ctx.close()`); konteks yang sedang diminta selalu dipertahankan.
+    Dataset yang dilepas dimuat ulang dari cache Arrow (mmap) saat diminta lagi.
+    """
+
+    def __init__(self, factory, budget_bytes, max_contexts=None):
+        self.factory = factory
+        self.budget_bytes = budget_bytes
+        self.max_contexts = max_contexts
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, name):
+        with self._lock:
+            ctx = self._contexts.get(name)
+            if ctx is None:
+                self.misses += 1
+                ctx = self._contexts[name] = self.factory(name)
+            else:
+                self.hits += 1
+                self._contexts.move_to_end(name)
+            self._evict(keep=name)
+            return ctx
+
+    def _evict(self, keep):
+        total = self._memory_bytes()
+        for name in list(self._contexts):      # terlama dulu
+            if total <= self.budget_bytes and (self.max_contexts is None
+                                               or len(self._contexts) <= self.max_contexts):
+                break
+            if name == keep:
+                continue
+            ctx = self._contexts.pop(name)
+            total -= ctx.memory_bytes()
+            ctx.close()
+            self.evictions += 1
+
+    def _memory_bytes(self):
+        return sum(ctx.memory_bytes() for ctx in self._contexts.values())
+
+    def memory_bytes(self):
+        with self._lock:
+            return self._memory_bytes()
+
+    def __contains__(self, name):
+        return name in self._contexts
+
+    def __len__(self):
+        return len(self._contexts)
+
+    def stats(self):
+        with self._lock:
+            memory = self._memory_bytes()
+        total = self.hits + self.misses
+        return {
+            'size': len(self._contexts),
+            'memory_bytes': memory,
+            'budget_bytes': self.budget_bytes,
+            'max_contexts': self.max_contexts,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
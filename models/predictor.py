@@ -1,59 +1,263 @@
-import pandas as pd
-from sklearn.linear_model import LinearRegression
-from datetime import timedelta
-import os
+import numpy as np
+from config import Config
+from utils.cache import LRUCache
+from utils.coalesce import SingleFlight
+from utils.metrics import metrics
+from models.artifacts import ArtifactStore
+from models.herd import HARI_KOSONG
+from models.regression import RunningLeastSquares, daily_stats, rolling_window_coefficients, grouped_least_squares
+
+# nama kolom baku (lihat utils.preprocessing.COL_MAP)
+TANGGAL_COL = 'tanggal_pemerahan'
+FITUR_COLS = ['jumlah_pakan_kg', 'rata_rata_suhu', 'umur_tahun', 'berat_badan_kg']
+TARGET_COL = 'produksi_susu_per_hari_liter'
+WINDOW_DAYS = 14
+
+# mode model: satu regresi gabungan per jendela 14 hari, atau satu regresi per kode sapi
+MODE_GABUNGAN = 'gabungan'
+MODE_PER_SAPI = 'per_sapi'
+MODES = (MODE_GABUNGAN, MODE_PER_SAPI)
+# minimal baris riwayat seekor sapi supaya model per sapi dipakai
+PER_SAPI_MIN_ROWS = WINDOW_DAYS
+
+
+def _kode_key(kode):
+    # sama dengan MilkPredictionApp.normalize_kode, tervektorisasi
+    return np.char.upper(np.char.strip(np.asarray(kode, dtype=object).astype(str)))
+
+
+def _hari(tanggal):
+    """Tanggal (string ISO, datetime, Timestamp) -> numpy datetime64[D]; pandas hanya untuk format lain."""
+    try:
+        return np.datetime64(tanggal, 'D')
+    except ValueError:
+        import pandas as pd
+        return np.datetime64(pd.to_datetime(tanggal).date(), 'D')
+
 
 class MilkPredictor:
-    def __init__(self, data_path):
-        self.data_path = data_path
-        self.model = LinearRegression()
+    def __init__(self, dataset, cache_name='window_coef', artifacts=None):
+        # dataset: models.dataset.DatasetStore yang dibagi dengan app
+        self.dataset = dataset
+        # tanggal valid, koefisien jendela & model per sapi tersimpan per versi dataset
+        self.artifacts = artifacts or ArtifactStore()
+        self.cache_name = cache_name
+        # (versi dataset, list tanggal valid, set untuk lookup O(1))
+        self._valid_cache = None
+        # koefisien model jendela per (versi dataset, tanggal prediksi)
+        self.coef_cache = LRUCache(Config.MODEL_CACHE_SIZE)
+        metrics.register_cache(cache_name, self.coef_cache.stats)
+        # request bersamaan untuk (versi dataset, tanggal) yang sama menunggu satu komputasi
+        self._flight = SingleFlight()
+        metrics.register_cache(f'{cache_name}.singleflight', self._flight.stats)
+        # (versi dataset, (hari pertama, statistik cukup per hari))
+        self._stats_cache = None
+        self._precomputed_version = None
+        # (versi dataset, {kode ternormalisasi: baris}, koefisien per sapi)
+        self._per_sapi = None
 
     def _load_data(self):
-        if not os.path.exists(self.data_path):
-            raise FileNotFoundError("Dataset belum diunggah.")
-        df = pd.read_csv(self.data_path)
-        df['tanggal pemerahan'] = pd.to_datetime(df['tanggal pemerahan'])
-        return df
+        # HerdData bersama (models.herd): kolom numpy ringkas, tanpa DataFrame pandas
+        return self.dataset.get_herd()
 
+    @metrics.timed('predictor.get_valid_dates')
     def get_valid_dates(self):
-        df = self._load_data()
-        tanggal_akhir = df['tanggal pemerahan'].max()
-        tanggal_awal = df['tanggal pemerahan'].min()
+        version = self.dataset.current_version()
+        if self._valid_cache is not None and self._valid_cache[0] == version:
+            return self._valid_cache[1]
 
-        tanggal_prediksi_mulai = tanggal_awal + timedelta(days=14)
-        tanggal_prediksi_akhir = tanggal_akhir + timedelta(days=1)
+        valid_dates = self._flight.do(('tanggal_valid', version), self._load_valid_dates, version)
+        self._valid_cache = (version, valid_dates, frozenset(valid_dates))
+        return valid_dates
 
-        valid_dates = []
-        while tanggal_prediksi_mulai <= tanggal_prediksi_akhir:
-            window = df[(df['tanggal pemerahan'] >= tanggal_prediksi_mulai - timedelta(days=14)) &
-                        (df['tanggal pemerahan'] < tanggal_prediksi_mulai)]
-            if window.shape[0] >= 14:
-                valid_dates.append(tanggal_prediksi_mulai.strftime('%Y-%m-%d'))
-            tanggal_prediksi_mulai += timedelta(days=1)
+    def _load_valid_dates(self, version):
+        art = self.artifacts.load(version, 'tanggal_valid')
+        if art is not None:
+            return art['tanggal'].tolist()
+        valid_dates = self._compute_valid_dates()
+        self.artifacts.save(version, 'tanggal_valid', tanggal=np.array(valid_dates, dtype=str))
+        return valid_dates
 
+    def _compute_valid_dates(self):
+        hari = self._load_data().hari[TANGGAL_COL]
+        hari = np.sort(hari[hari != HARI_KOSONG])
+        valid_dates = []
+        if hari.size:
+            # kandidat (hari ke-): (hari awal + 14) s/d (hari akhir + 1)
+            kandidat = np.arange(int(hari[0]) + WINDOW_DAYS, int(hari[-1]) + 2)
+            # jumlah baris di jendela [kandidat - 14 hari, kandidat) lewat searchsorted, sekali jalan
+            jumlah = (np.searchsorted(hari, kandidat, side='left') -
+                      np.searchsorted(hari, kandidat - WINDOW_DAYS, side='left'))
+            valid_dates = np.datetime_as_string(kandidat[jumlah >= WINDOW_DAYS].astype('datetime64[D]'),
+                                                unit='D').tolist()
         return valid_dates
 
-    def train_and_predict(self, tanggal_prediksi, fitur):
-        df = self._load_data()
-        tanggal_prediksi = pd.to_datetime(tanggal_prediksi)
-        window = df[(df['tanggal pemerahan'] >= tanggal_prediksi - timedelta(days=14)) &
-                    (df['tanggal pemerahan'] < tanggal_prediksi)]
-        if window.shape[0] < 14:
+    def is_valid_date(self, tanggal):
+        """Cek O(1) apakah tanggal (string YYYY-MM-DD) bisa diprediksi."""
+        self.get_valid_dates()
+        return tanggal in self._valid_cache[2]
+
+    def _window_stats(self):
+        """Statistik cukup regresi per hari (XᵀX, Xᵀy, n), dihitung sekali per versi dataset."""
+        herd = self._load_data()
+        if self._stats_cache is not None and self._stats_cache[0] == self.dataset.version:
+            return self._stats_cache[1]
+
+        mask = herd.lengkap([TANGGAL_COL] + FITUR_COLS + [TARGET_COL])
+        if not mask.any():
+            raise ValueError("Data kurang dari 14 hari untuk prediksi.")
+        hari = herd.hari[TANGGAL_COL][mask]
+        day0 = int(hari.min())
+        day_idx = hari.astype(np.int64) - day0
+        stats = daily_stats(day_idx, herd.matrix(FITUR_COLS, mask),
+                            herd.matrix([TARGET_COL], mask)[:, 0], int(day_idx.max()) + 1)
+        day0 = np.datetime64(day0, 'D')
+
+        self._stats_cache = (self.dataset.version, (day0, stats))
+        return self._stats_cache[1]
+
+    @metrics.timed('predictor.precompute_coefficients')
+    def precompute_coefficients(self):
+        """
+        Koefisien semua tanggal valid: dari artefak tersimpan, atau dihitung dalam satu
+        lintasan (sliding window) lalu disimpan. Hasilnya mengisi LRU cache.
+        """
+        version = self.dataset.current_version()
+        art = self.artifacts.load(version, 'koef_jendela')
+        if art is not None:
+            tanggal_list, coefs = art['tanggal'].tolist(), art['coef']
+        else:
+            tanggal_list, coefs = self._compute_window_coefficients()
+            self.artifacts.save(version, 'koef_jendela', tanggal=np.array(tanggal_list, dtype=str),
+                                coef=coefs.reshape(-1, len(FITUR_COLS) + 1))
+        # urut dari tanggal lama ke baru supaya yang terbaru paling lama bertahan di LRU
+        for tanggal, coef in zip(tanggal_list, coefs):
+            self.coef_cache.put((version, tanggal), coef)
+        self._precomputed_version = version
+
+    def _compute_window_coefficients(self):
+        day0, (xtx, xty, n) = self._window_stats()
+        coefs = rolling_window_coefficients(xtx, xty, n, WINDOW_DAYS)
+        tanggal = np.array(self.get_valid_dates(), dtype='datetime64[D]')
+        t = (tanggal - day0).astype(np.int64)
+        ok = (t >= 0) & (t < len(coefs))
+        ok[ok] = ~np.isnan(coefs[t[ok]]).any(axis=1)
+        return np.datetime_as_string(tanggal[ok], unit='D').tolist(), coefs[t[ok]]
+
+    def _fit_window(self, tanggal_prediksi):
+        """Solve langsung regresi pada jendela 14 hari sebelum tanggal; kembalikan [b0, b1..b4]."""
+        day0, (xtx, xty, n) = self._window_stats()
+        t = int((tanggal_prediksi - day0).astype(np.int64))
+        awal, akhir = max(t - WINDOW_DAYS, 0), min(max(t, 0), len(n))
+        stats = RunningLeastSquares(len(FITUR_COLS))
+        stats.add_stats(xtx[awal:akhir].sum(axis=0), xty[awal:akhir].sum(axis=0), int(n[awal:akhir].sum()))
+        coef = stats.solve()
+        if coef is None:
+            raise ValueError("Data kurang dari 14 hari untuk prediksi.")
+        return coef
+
+    @metrics.timed('predictor.window_coefficients')
+    def window_coefficients(self, tanggal_prediksi):
+        """Koefisien model jendela untuk tanggal prediksi, diambil dari LRU cache bila ada."""
+        version = self.dataset.current_version()  # pastikan versi dataset terbaru
+        tanggal_prediksi = _hari(tanggal_prediksi)
+        key = (version, str(tanggal_prediksi))
+        coef = self.coef_cache.get(key)
+        if coef is not None:
+            return coef
+
+        if not self.is_valid_date(key[1]):
             raise ValueError("Data kurang dari 14 hari untuk prediksi.")
+        if self._precomputed_version != version:
+            self._flight.do(('koef_jendela', version), self._precompute_once, version)
+            coef = self.coef_cache.get(key)
+        if coef is None:
+            # sudah tergusur dari cache: hitung ulang dari statistik harian (14 penjumlahan + solve 5×5)
+            coef = self._flight.do(key, self._fit_window, tanggal_prediksi)
+            self.coef_cache.put(key, coef)
+        return coef
+
+    def _precompute_once(self, version):
+        if self._precomputed_version != version:
+            self.precompute_coefficients()
+
+    # --- model per sapi ---
+
+    @metrics.timed('predictor.fit_per_sapi')
+    def fit_per_sapi(self):
+        """
+        Latih satu regresi per kode sapi atas seluruh riwayatnya, semua sapi dalam satu
+        solve batch (models.regression.grouped_least_squares), lalu simpan sebagai artefak
+        supaya worker lain tinggal memuatnya.
+        """
+        herd = self._load_data()
+        mask = herd.lengkap(['kode_sapi'] + FITUR_COLS + [TARGET_COL])
+        # normalisasi cukup per kategori, lalu dipetakan lewat kode int32 tiap baris
+        kode, kategori_idx = np.unique(_kode_key(herd.kategori), return_inverse=True)
+        group_idx = kategori_idx[herd.kode[mask]]
+        coef, _ = grouped_least_squares(group_idx, herd.matrix(FITUR_COLS, mask),
+                                        herd.matrix([TARGET_COL], mask)[:, 0], len(kode),
+                                        min_rows=PER_SAPI_MIN_ROWS)
+        kode = np.asarray(kode, dtype=str)
+        self.artifacts.save(self.dataset.version, 'per_sapi', kode=kode, coef=coef)
+        return kode, coef
+
+    def per_sapi_coefficients(self):
+        """({kode ternormalisasi: indeks baris}, koefisien per sapi), dari artefak bila sudah ada."""
+        version = self.dataset.current_version()
+        if self._per_sapi is not None and self._per_sapi[0] == version:
+            return self._per_sapi[1:]
+        kode, coef = self._flight.do(('per_sapi', version), self._load_per_sapi, version)
+        self._per_sapi = (version, {k: i for i, k in enumerate(kode)}, coef)
+        return self._per_sapi[1:]
+
+    def _load_per_sapi(self, version):
+        art = self.artifacts.load(version, 'per_sapi')
+        if art is not None:
+            return art['kode'], art['coef']
+        return self.fit_per_sapi()
+
+    def _per_sapi_lookup(self, kode_list):
+        index, coef = self.per_sapi_coefficients()
+        keys = _kode_key(kode_list)
+        rows = np.array([index.get(k, -1) for k in keys], dtype=np.int64)
+        ada = (rows >= 0) & ~np.isnan(coef[rows]).any(axis=1) if len(coef) else np.zeros(len(rows), dtype=bool)
+        return keys, rows, ada, coef
+
+    def per_sapi_available(self, kode_list):
+        """Mask boolean: sapi mana yang punya model per sapi (riwayat cukup)."""
+        return self._per_sapi_lookup(kode_list)[2]
+
+    def _per_sapi_rows(self, kode_list):
+        keys, rows, ada, coef = self._per_sapi_lookup(kode_list)
+        kurang = ~ada
+        if kurang.any():
+            contoh = ', '.join(sorted(set(keys[kurang]))[:5])
+            raise ValueError(f"Model per sapi tidak tersedia untuk {contoh} "
+                             f"(riwayat kurang dari {PER_SAPI_MIN_ROWS} baris).")
+        return coef[rows]
+
+    def train_and_predict(self, tanggal_prediksi, fitur, mode=MODE_GABUNGAN, kode_sapi=None):
+        if mode == MODE_PER_SAPI:
+            coef = self._per_sapi_rows([kode_sapi])[0]
+        else:
+            coef = self.window_coefficients(tanggal_prediksi)
+        return round(float(coef[0] + np.dot(coef[1:], fitur)), 2)
 
-        X = window[['jumlah pakan (kg)', 'Rata-rata Suhu', 'umur (tahun)', 'berat badan (kg)']]
-        y = window[['produksi susu/hari (liter)']]
-        self.model.fit(X, y)
-        return round(self.model.predict([fitur])[0][0], 2)
-
-    def get_analysis_model(self, riwayat_df):
-        X = riwayat_df[['Jumlah Pakan', 'Suhu', 'Umur', 'Berat Badan']]
-        y = riwayat_df[['Produksi Susu']]
-        self.model.fit(X, y)
-        return {
-            'b0': self.model.intercept_[0],
-            'b1': self.model.coef_[0][0],
-            'b2': self.model.coef_[0][1],
-            'b3': self.model.coef_[0][2],
-            'b4': self.model.coef_[0][3]
-        }
+    @metrics.timed('predictor.predict_batch')
+    def predict_batch(self, tanggal_list, fitur, mode=MODE_GABUNGAN, kode_list=None):
+        """
+        Prediksi banyak baris sekaligus. Baris dikelompokkan per tanggal sehingga tiap
+        jendela hanya dihitung sekali (atau diambil per sapi untuk mode per_sapi),
+        lalu semua diprediksi dengan satu perkalian matriks.
+        """
+        if len(fitur) == 0:
+            # semua baris gagal validasi: tidak ada jendela yang perlu dihitung
+            return np.empty(0)
+        if mode == MODE_PER_SAPI:
+            B = self._per_sapi_rows(kode_list)
+        else:
+            unik, inverse = np.unique(np.asarray(tanggal_list, dtype=str), return_inverse=True)
+            B = np.vstack([self.window_coefficients(t) for t in unik])[inverse]
+        Z = RunningLeastSquares.design(fitur)
+        return np.round(np.einsum('ij,ij->i', Z, B), 2)
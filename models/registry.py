@@ -0,0 +1,79 @@
+import json
+import os
+import re
+import threading
+import time
+
+from config import Config
+
+_NAMA_INVALID = re.compile(r'[^a-z0-9_-]+')
+
+
+def normalize_dataset_name(name):
+    """Nama dataset/peternakan yang aman dipakai sebagai nama file (huruf kecil, angka, '-', '_')."""
+    name = _NAMA_INVALID.sub('-', str(name or '').strip().lower()).strip('-')[:64]
+    return name or Config.DEFAULT_DATASET
+
+
+def registry_path(name):
+    return os.path.join(Config.REGISTRY_FOLDER, f'{normalize_dataset_name(name)}.json')
+
+
+def list_datasets():
+    """Semua dataset yang pernah di-publish: {nama: entri}, urut nama."""
+    try:
+        files = sorted(f for f in os.listdir(Config.REGISTRY_FOLDER) if f.endswith('.json'))
+    except FileNotFoundError:
+        return {}
+    datasets = {}
+    for f in files:
+        entry = DatasetRegistry(os.path.join(Config.REGISTRY_FOLDER, f)).read()
+        if entry:
+            datasets[f[:-len('.json')]] = entry
+    return datasets
+
+
+class DatasetRegistry:
+    """
+    Registry satu dataset di disk (file JSON kecil per nama dataset) yang dibaca semua worker.
+
+    Worker yang menerima upload mem-publish (path CSV, versi/hash, path cache Arrow);
+    worker lain cukup membandingkan mtime file registry tiap request dan, bila berubah,
+    memetakan cache yang sama lewat mmap tanpa mem-parse ulang CSV.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or registry_path(Config.DEFAULT_DATASET)
+        self._stat = None
+        self._entry = None
+        self._lock = threading.Lock()
+
+    def publish(self, path, version, cache_path):
+        """Tulis entri aktif secara atomik (tulis file sementara lalu os.replace)."""
+        entry = {
+            'path': os.path.abspath(path),
+            'version': version,
+            'cache_path': os.path.abspath(cache_path),
+            'waktu': time.time(),
+        }
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp, self.path)
+        return entry
+
+    def read(self):
+        """Entri aktif (dict) atau None; file hanya dibaca ulang bila mtime/ukurannya berubah."""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._stat, self._entry = None, None
+                return None
+            key = (stat.st_mtime_ns, stat.st_size)
+            if key != self._stat:
+                with open(self.path) as f:
+                    self._entry = json.load(f)
+                self._stat = key
+            return self._entry
@@ -0,0 +1,134 @@
+import numpy as np
+
+
+class RunningLeastSquares:
+    """
+    Regresi linear (dengan intercept) berbasis statistik cukup: XᵀX, Xᵀy dan n.
+
+    Data bisa ditambah/dikurangi kapan saja; koefisien [b0, b1..bk] didapat dari
+    solusi langsung sistem (k+1)×(k+1), tanpa melatih ulang dari data mentah.
+    """
+
+    def __init__(self, n_features=4):
+        k = n_features + 1
+        self.xtx = np.zeros((k, k))
+        self.xty = np.zeros(k)
+        self.n = 0
+
+    @staticmethod
+    def design(X):
+        X = np.asarray(X, dtype=float)
+        return np.column_stack([np.ones(len(X)), X])
+
+    def add(self, X, y):
+        Z = self.design(X)
+        y = np.asarray(y, dtype=float).ravel()
+        self.add_stats(Z.T @ Z, Z.T @ y, len(y))
+
+    def remove(self, X, y):
+        Z = self.design(X)
+        y = np.asarray(y, dtype=float).ravel()
+        self.remove_stats(Z.T @ Z, Z.T @ y, len(y))
+
+    def add_stats(self, xtx, xty, n):
+        self.xtx += xtx
+        self.xty += xty
+        self.n += n
+
+    def remove_stats(self, xtx, xty, n):
+        self.xtx -= xtx
+        self.xty -= xty
+        self.n -= n
+
+    def solve(self):
+        """Kembalikan koefisien [b0, b1..bk]; None jika belum ada data."""
+        if self.n <= 0:
+            return None
+        A, b = self.xtx, self.xty
+        # skala diagonal supaya pengecekan kondisi tidak didominasi satuan (berat ~500 vs suhu ~30)
+        d = np.sqrt(np.diag(A))
+        d[d == 0] = 1.0
+        A_scaled = A / np.outer(d, d)
+        if np.linalg.cond(A_scaled) < 1e10:
+            return np.linalg.solve(A_scaled, b / d) / d
+        return self._solve_centered()
+
+    def _solve_centered(self):
+        # fallback untuk sistem singular (mis. kolom konstan): selesaikan versi terpusat
+        # dengan least-squares minimum-norm, sama seperti LinearRegression (sklearn)
+        n = self.n
+        sx = self.xtx[0, 1:]
+        sy = self.xty[0]
+        sxx = self.xtx[1:, 1:] - np.outer(sx, sx) / n
+        sxy = self.xty[1:] - sx * sy / n
+        coef = np.linalg.lstsq(sxx, sxy, rcond=1e-10)[0]
+        intercept = (sy - sx @ coef) / n
+        return np.concatenate([[intercept], coef])
+
+
+def daily_stats(day_idx, X, y, n_days):
+    """
+    Statistik cukup per hari: XᵀX (n_days×k×k), Xᵀy (n_days×k) dan jumlah baris (n_days).
+    Dihitung dengan bincount per pasangan kolom, jadi memori tetap O(baris).
+    """
+    Z = RunningLeastSquares.design(X)
+    y = np.asarray(y, dtype=float).ravel()
+    k = Z.shape[1]
+    xtx = np.empty((n_days, k, k))
+    for i in range(k):
+        for j in range(i, k):
+            xtx[:, i, j] = xtx[:, j, i] = np.bincount(day_idx, weights=Z[:, i] * Z[:, j], minlength=n_days)
+    xty = np.column_stack([np.bincount(day_idx, weights=Z[:, i] * y, minlength=n_days) for i in range(k)])
+    n = np.bincount(day_idx, minlength=n_days)
+    return xtx, xty, n
+
+
+def rolling_window_coefficients(xtx, xty, n, window):
+    """
+    Koefisien untuk setiap hari target t = 1..n_days, memakai jendela hari [t-window, t).
+    Satu lintasan linear: hari yang masuk ditambahkan, hari yang keluar dikurangkan.
+    Mengembalikan array (n_days+1)×k; baris tanpa data berisi NaN.
+    """
+    n_days, k = xty.shape
+    coefs = np.full((n_days + 1, k), np.nan)
+    stats = RunningLeastSquares(k - 1)
+    for t in range(1, n_days + 1):
+        stats.add_stats(xtx[t - 1], xty[t - 1], n[t - 1])
+        if t - 1 - window >= 0:
+            keluar = t - 1 - window
+            stats.remove_stats(xtx[keluar], xty[keluar], n[keluar])
+        if stats.n > 0:
+            coefs[t] = stats.solve()
+    return coefs
+
+
+def grouped_least_squares(group_idx, X, y, n_groups, min_rows=2, rcond=1e-10):
+    """
+    Regresi linear terpisah untuk setiap grup (mis. per kode sapi) dalam satu solve batch.
+
+    Data dipusatkan per grup lalu matriks kovarians (n_groups×k×k) di-pinv sekaligus,
+    sehingga hasilnya sama dengan LinearRegression per grup termasuk kolom yang konstan
+    di dalam grup (solusi minimum-norm, koefisiennya 0). Mengembalikan (coef, n) dengan
+    coef (n_groups×(k+1)) = [b0, b1..bk]; grup dengan baris < min_rows berisi NaN.
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float).ravel()
+    k = X.shape[1]
+    n = np.bincount(group_idx, minlength=n_groups)
+    pembagi = np.maximum(n, 1)
+    mean_x = np.column_stack([np.bincount(group_idx, weights=X[:, i], minlength=n_groups) for i in range(k)])
+    mean_x /= pembagi[:, None]
+    mean_y = np.bincount(group_idx, weights=y, minlength=n_groups) / pembagi
+    Xc = X - mean_x[group_idx]
+    yc = y - mean_y[group_idx]
+
+    sxx = np.empty((n_groups, k, k))
+    for i in range(k):
+        for j in range(i, k):
+            sxx[:, i, j] = sxx[:, j, i] = np.bincount(group_idx, weights=Xc[:, i] * Xc[:, j], minlength=n_groups)
+    sxy = np.column_stack([np.bincount(group_idx, weights=Xc[:, i] * yc, minlength=n_groups) for i in range(k)])
+
+    b = np.einsum('gij,gj->gi', np.linalg.pinv(sxx, rcond=rcond, hermitian=True), sxy)
+    coef = np.column_stack([mean_y - np.einsum('gi,gi->g', mean_x, b), b])
+    coef[n < min_rows] = np.nan
+    return coef, n
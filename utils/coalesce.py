@@ -0,0 +1,135 @@
+import threading
+from concurrent.futures import Future
+
+from utils.metrics import metrics
+
+
+class SingleFlight:
+    """
+    Satukan pemanggilan bersamaan dengan kunci yang sama: thread pertama menjalankan fungsi,
+    thread lain yang datang selama masih berjalan menunggu dan menerima hasil (atau error) yang sama.
+    Tidak menyimpan hasil setelah selesai; itu tugas cache pemanggil (mis. utils.cache.LRUCache).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}        # kunci -> Future milik thread yang sedang menghitung
+        self.calls = 0          # jumlah komputasi yang benar-benar dijalankan
+        self.shared = 0         # jumlah pemanggil yang menumpang komputasi thread lain
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            pemimpin = future is None
+            if pemimpin:
+                future = self._calls[key] = Future()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not pemimpin:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stats(self):
+        """Format seperti LRUCache.stats: hits = pemanggil yang menumpang, misses = komputasi."""
+        total = self.calls + self.shared
+        return {
+            'hits': self.shared,
+            'misses': self.calls,
+            'hit_ratio': (self.shared / total) if total else 0.0,
+        }
+
+
+class _Batch:
+    def __init__(self):
+        self.items = []
+        self.futures = []
+        self.penuh = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Kumpulkan item yang datang dalam `max_wait` detik (atau sampai `max_size` item) lalu
+    proses sekaligus lewat `fn(key, items) -> list hasil` (urutan sama dengan items).
+
+    Tanpa thread latar: pemanggil pertama tiap kunci menjadi pengumpul, menjalankan fn, lalu
+    membagikan hasil ke pemanggil lain. Pengumpul hanya menunggu jendela waktu bila ada request
+    lain yang sedang berjalan; request tunggal langsung diproses tanpa tambahan latensi.
+    Item dengan kunci berbeda (mis. mode model) tidak pernah dicampur dalam satu batch.
+
+    Hasil berupa instance Exception diteruskan sebagai error ke pemanggil item itu saja.
+    Bila fn gagal untuk seluruh batch, tiap item diulang sendiri-sendiri supaya satu item
+    bermasalah tidak menggagalkan request lain yang kebetulan satu batch.
+    """
+
+    def __init__(self, fn, max_wait=0.005, max_size=256, name=None):
+        self.fn = fn
+        self.max_wait = max_wait
+        self.max_size = max_size
+        self.name = name
+        self._lock = threading.Lock()
+        self._pending = {}      # kunci -> _Batch yang masih menerima item
+        self._aktif = 0         # pemanggil submit yang belum selesai (semua kunci)
+
+    def submit(self, key, item):
+        """Masukkan satu item dan tunggu hasilnya (atau exception khusus item ini)."""
+        future = Future()
+        with self._lock:
+            self._aktif += 1
+            # tidak ada request lain yang berjalan: tak ada yang perlu ditunggu
+            tunggu = self._aktif > 1
+            batch = self._pending.get(key)
+            pengumpul = batch is None
+            if pengumpul:
+                batch = self._pending[key] = _Batch()
+            batch.items.append(item)
+            batch.futures.append(future)
+            if len(batch.items) >= self.max_size:
+                # batch ditutup; item berikutnya membuka batch baru
+                del self._pending[key]
+                batch.penuh.set()
+
+        try:
+            if pengumpul:
+                if tunggu:
+                    batch.penuh.wait(self.max_wait)
+                with self._lock:
+                    if self._pending.get(key) is batch:
+                        del self._pending[key]
+                self._jalankan(key, batch)
+            return future.result()
+        finally:
+            with self._lock:
+                self._aktif -= 1
+
+    def _jalankan(self, key, batch):
+        if self.name:
+            metrics.observe('microbatch_size', len(batch.items), batcher=self.name)
+        try:
+            hasil = self.fn(key, batch.items)
+        except Exception as e:
+            if len(batch.items) == 1:
+                hasil = [e]
+            else:
+                hasil = [self._satu(key, item) for item in batch.items]
+        for future, h in zip(batch.futures, hasil):
+            if isinstance(h, Exception):
+                future.set_exception(h)
+            else:
+                future.set_result(h)
+
+    def _satu(self, key, item):
+        try:
+            return self.fn(key, [item])[0]
+        except Exception as e:
+            return e
@@ -0,0 +1,109 @@
+import csv
+import io
+import os
+import tempfile
+
+# format -> (mimetype, ekstensi file)
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+# ukuran potongan saat mengalirkan file sementara (xlsx)
+BLOK_BYTES = 1 << 16
+
+
+def stream(format, kolom, chunks, angka=()):
+    """
+    Generator bytes file `format` dari `chunks` (iterable list baris/tuple urut `kolom`).
+    Tiap chunk ditulis lalu dilepas, jadi memori tidak bergantung pada jumlah baris.
+    `angka` = kolom numerik (float64 di Parquet; kolom lain string).
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Format harus salah satu dari {list(FORMATS)}.")
+    if format == 'csv':
+        return _csv(kolom, chunks)
+    if format == 'parquet':
+        return _parquet(kolom, chunks, set(angka))
+    return _xlsx(kolom, chunks)
+
+
+def _csv(kolom, chunks):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(kolom)
+    yield buf.getvalue().encode('utf-8')
+    for rows in chunks:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(rows)
+        yield buf.getvalue().encode('utf-8')
+
+
+class _Aliran(io.RawIOBase):
+    """Sink tulis-saja untuk ParquetWriter: isi diambil per row group, posisi (tell) tetap bertambah."""
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def ambil(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet(kolom, chunks, angka):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(k, pa.float64() if k in angka else pa.string()) for k in kolom])
+    sink = _Aliran()
+    # satu row group per chunk; footer (offset row group) ditulis saat close
+    with pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema) as writer:
+        for rows in chunks:
+            kolom_data = list(zip(*rows)) if rows else [()] * len(kolom)
+            writer.write_table(pa.table([pa.array(v, type=f.type) for v, f in zip(kolom_data, schema)],
+                                        schema=schema))
+            yield sink.ambil()
+    yield sink.ambil()
+
+
+def _xlsx(kolom, chunks):
+    """
+    xlsx adalah arsip zip yang baru lengkap setelah semua baris ditulis: openpyxl write-only
+    menulis baris ke file sementara (memori tetap), lalu file dialirkan per blok.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(kolom)
+    for rows in chunks:
+        for row in rows:
+            ws.append(row)
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        wb.save(path)
+        with open(path, 'rb') as f:
+            while True:
+                blok = f.read(BLOK_BYTES)
+                if not blok:
+                    break
+                yield blok
+    finally:
+        os.remove(path)
@@ -0,0 +1,237 @@
+import codecs
+import hashlib
+import os
+
+from config import Config
+from utils.metrics import metrics
+from utils.schema import COL_MAP, NUMERIC_COLS, UPLOAD_REQUIRED_COLS, resolve_columns, validate_columns
+
+DATE_COLS = ['tanggal_pemerahan', 'tanggal_lahir']
+# kolom numerik tambahan yang ikut disimpan (untuk fallback produksi pagi + sore)
+EXTRA_NUMERIC_COLS = ['produksi_susu_pagi_liter', 'produksi_susu_sore_liter']
+KNOWN_COLS = set(COL_MAP.values())
+# naikkan bila tipe kolom cache berubah (2 = kode dictionary, tanggal date32, ukuran float32)
+CACHE_FORMAT = 2
+
+# pandas & pyarrow diimpor di dalam fungsi: scan_file/cache_path dipakai saat startup worker,
+# sedangkan parsing & pembacaan cache hanya terjadi saat upload atau saat frame dibutuhkan.
+
+
+@metrics.timed('ingest.scan_file')
+def scan_file(path, chunk_size=1 << 20):
+    """
+    Satu lintasan biner atas file: hash sha1 (versi dataset) sekaligus deteksi encoding
+    (utf-8 / utf-8-sig, fallback latin1) tanpa memuat seluruh file ke memori.
+    """
+    h = hashlib.sha1()
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    encoding = 'utf-8'
+    with open(path, 'rb') as f:
+        first = True
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+            if first and chunk.startswith(codecs.BOM_UTF8):
+                encoding = 'utf-8-sig'
+            first = False
+            if encoding != 'latin1':
+                try:
+                    decoder.decode(chunk)
+                except UnicodeDecodeError:
+                    encoding = 'latin1'
+    return h.hexdigest(), encoding
+
+
+def cache_path(version):
+    return os.path.join(Config.CACHE_FOLDER, f'{version}.v{CACHE_FORMAT}.arrow')
+
+
+def _arrow_schema(columns):
+    import pyarrow as pa
+    fields = []
+    for c in columns:
+        if c == 'kode_sapi':
+            fields.append(pa.field(c, pa.string()))
+        elif c in DATE_COLS:
+            fields.append(pa.field(c, pa.timestamp('ns')))
+        else:
+            fields.append(pa.field(c, pa.float64()))
+    return pa.schema(fields)
+
+
+def _plan_columns(path, encoding, required):
+    """Baca header saja, validasi, dan tentukan usecols/dtype berdasarkan nama kolom asli."""
+    import pandas as pd
+    header = list(pd.read_csv(path, encoding=encoding, nrows=0).columns)
+    resolved = resolve_columns(header)
+
+    available = set(resolved)
+    if {'produksi_susu_pagi_liter', 'produksi_susu_sore_liter'} <= available:
+        # produksi per hari bisa dihitung dari pagi + sore
+        available.add('produksi_susu_per_hari_liter')
+    validate_columns(sorted(available), required)
+
+    usecols, names = [], {}
+    for orig, canon in zip(header, resolved):
+        if canon in KNOWN_COLS and canon not in names.values():
+            usecols.append(orig)
+            names[orig] = canon
+    return usecols, names
+
+
+def _typed_chunk(chunk, names):
+    import pandas as pd
+    from utils.preprocessing import fill_produksi_harian
+    chunk = chunk.rename(columns=names)
+    fill_produksi_harian(chunk)
+    for c in DATE_COLS:
+        if c in chunk.columns:
+            chunk[c] = pd.to_datetime(chunk[c], errors='coerce')
+    for c in NUMERIC_COLS + EXTRA_NUMERIC_COLS:
+        if c in chunk.columns:
+            chunk[c] = pd.to_numeric(chunk[c], errors='coerce')
+    return chunk
+
+
+@metrics.timed('ingest.ingest_csv')
+def ingest_csv(path, encoding, dest, required=UPLOAD_REQUIRED_COLS, chunksize=None):
+    """
+    Streaming CSV -> cache kolumnar Arrow IPC (`dest`), per chunk dengan usecols & dtype eksplisit.
+    Melempar MissingColumnsError sebelum ada data yang ditulis jika header tidak valid.
+
+    Chunk digabung menjadi satu record batch di akhir, dengan tipe ringkas (lihat _compact),
+    supaya kolom bisa dipetakan zero-copy (read_cache) dan semua worker berbagi page cache yang sama.
+    """
+    chunksize = chunksize or Config.INGEST_CHUNK_SIZE
+    usecols, names = _plan_columns(path, encoding, required)
+    inv = {canon: orig for orig, canon in names.items()}
+
+    dtype = {inv['kode_sapi']: str}
+    for c in DATE_COLS:
+        if c in inv:
+            dtype[inv[c]] = str
+    numeric = {inv[c]: 'float64' for c in NUMERIC_COLS + EXTRA_NUMERIC_COLS if c in inv}
+
+    os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+    chunks = dest + '.chunks.tmp'
+    tmp = dest + '.tmp'
+    try:
+        try:
+            _write_chunks(path, encoding, usecols, {**dtype, **numeric}, names, chunksize, chunks)
+        except ValueError:
+            # ada nilai non-numerik: baca ulang sebagai teks lalu to_numeric(errors='coerce')
+            _write_chunks(path, encoding, usecols, {**dtype, **{c: str for c in numeric}}, names, chunksize, chunks)
+        _compact(chunks, tmp)
+        os.replace(tmp, dest)
+    finally:
+        for p in (chunks, tmp):
+            if os.path.exists(p):
+                os.remove(p)
+    return dest
+
+
+def _write_chunks(path, encoding, usecols, dtype, names, chunksize, dest):
+    import pandas as pd
+    import pyarrow as pa
+    writer = None
+    try:
+        reader = pd.read_csv(path, encoding=encoding, usecols=usecols, dtype=dtype, chunksize=chunksize)
+        for chunk in reader:
+            chunk = _typed_chunk(chunk, names)
+            if writer is None:
+                schema = _arrow_schema(chunk.columns)
+                writer = pa.ipc.new_file(dest, schema)
+            writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+        if writer is None:
+            # file tanpa baris data
+            schema = _arrow_schema([names[c] for c in usecols])
+            writer = pa.ipc.new_file(dest, schema)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _compact(src, dest):
+    """
+    Tulis ulang file IPC multi-batch sebagai satu batch (kolom kontigu) bertipe ringkas:
+    kode sapi dictionary (indeks int32), tanggal date32 (int32 hari), ukuran float32.
+
+    Dikerjakan per record batch supaya memori ingest tetap terbatas: lintasan pertama
+    mengumpulkan kamus kode sapi (kecil), lintasan kedua meng-cast tiap batch dan
+    menambahkan nilainya ke file sementara per kolom. Batch akhir dibangun dari file
+    kolom yang di-mmap, jadi tabel lengkap tidak pernah ada di RAM.
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    files = []
+    try:
+        with pa.memory_map(src, 'r') as source:
+            reader = pa.ipc.open_file(source)
+            schema = reader.schema
+            batches = [reader.get_batch(i) for i in range(reader.num_record_batches)]   # view mmap
+            n = sum(b.num_rows for b in batches)
+
+            kamus = {}
+            if 'kode_sapi' in schema.names:
+                for b in batches:
+                    kamus.update(dict.fromkeys(pc.unique(b.column('kode_sapi')).drop_null().to_pylist()))
+            kamus = pa.array(list(kamus), type=pa.string())
+
+            fields, kolom = [], []
+            for i, field in enumerate(schema):
+                if field.name == 'kode_sapi':
+                    tipe, dtype = pa.dictionary(pa.int32(), pa.string()), np.int32
+                elif field.name in DATE_COLS:
+                    tipe, dtype = pa.date32(), np.int32
+                else:
+                    tipe, dtype = pa.float32(), np.float32
+                path_nilai, path_valid = f'{dest}.{i}.nilai.tmp', f'{dest}.{i}.valid.tmp'
+                files += [path_nilai, path_valid]
+                nulls = 0
+                with open(path_nilai, 'wb') as f_nilai, open(path_valid, 'wb') as f_valid:
+                    for b in batches:
+                        arr = b.column(i)
+                        if field.name == 'kode_sapi':
+                            arr = pc.index_in(arr, value_set=kamus).cast(pa.int32())
+                        elif field.name in DATE_COLS:
+                            arr = pc.cast(arr, pa.date32(), safe=False).cast(pa.int32())   # jam dibuang
+                        else:
+                            arr = arr.cast(pa.float32())
+                        nulls += arr.null_count
+                        # slot null diisi 0; yang menentukan kosong tetaplah bitmap validitas
+                        arr.fill_null(0).to_numpy().astype(dtype, copy=False).tofile(f_nilai)
+                        np.asarray(arr.is_valid()).tofile(f_valid)
+                kolom.append(_kolom_mmap(pa, np, tipe, dtype, n, path_nilai, path_valid, nulls, kamus))
+                fields.append(pa.field(field.name, tipe))
+
+        batch = pa.record_batch(kolom, schema=pa.schema(fields))
+        with pa.ipc.new_file(dest, batch.schema) as writer:
+            writer.write_batch(batch)
+    finally:
+        for p in files:
+            if os.path.exists(p):
+                os.remove(p)
+
+
+def _kolom_mmap(pa, np, tipe, dtype, n, path_nilai, path_valid, nulls, kamus):
+    """Array Arrow yang buffer nilainya menunjuk ke file kolom sementara (mmap), plus bitmap null."""
+    nilai = pa.py_buffer(np.memmap(path_nilai, dtype=dtype, mode='r', shape=(n,))) if n else pa.py_buffer(b'')
+    bitmap = None
+    if nulls:
+        valid = np.memmap(path_valid, dtype=np.bool_, mode='r', shape=(n,))
+        bitmap = pa.py_buffer(np.packbits(valid, bitorder='little'))
+    if pa.types.is_dictionary(tipe):
+        indices = pa.Array.from_buffers(pa.int32(), n, [bitmap, nilai], null_count=nulls)
+        return pa.DictionaryArray.from_arrays(indices, kamus)
+    return pa.Array.from_buffers(tipe, n, [bitmap, nilai], null_count=nulls)
+
+
+def read_cache(path):
+    """
+    Baca cache Arrow IPC lewat memory-map sebagai pyarrow.Table; buffer kolom menunjuk
+    langsung ke halaman file (read-only, dibagi antar proses). Lihat models.herd.HerdData.
+    """
+    import pyarrow as pa
+    source = pa.memory_map(path, 'r')
+    return pa.ipc.open_file(source).read_all()
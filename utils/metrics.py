@@ -0,0 +1,154 @@
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from config import Config
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Ringkasan latensi: count & sum total, kuantil dari reservoir sampel terakhir."""
+
+    def __init__(self, reservoir_size):
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=reservoir_size)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+
+    def quantiles(self):
+        if not self.samples:
+            return {q: 0.0 for q in QUANTILES}
+        data = sorted(self.samples)
+        last = len(data) - 1
+        return {q: data[min(int(round(q * last)), last)] for q in QUANTILES}
+
+
+class Metrics:
+    """Registry metrik in-process: histogram latensi (route & span) dan statistik cache."""
+
+    def __init__(self, enabled=True, reservoir_size=1024):
+        self.enabled = enabled
+        self.reservoir_size = reservoir_size
+        self._lock = threading.Lock()
+        self._histograms = {}   # (nama metrik, label tuple) -> Histogram
+        self._caches = {}       # nama -> callable yang mengembalikan dict stats()
+
+    def observe(self, metric, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(self.reservoir_size)
+            hist.observe(seconds)
+
+    @contextmanager
+    def span(self, name):
+        """Ukur durasi blok kode: `with metrics.span('preview.to_html'): ...`"""
+        if not self.enabled:
+            yield
+            return
+        mulai = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('span_seconds', time.perf_counter() - mulai, span=name)
+
+    def timed(self, name):
+        """Decorator span untuk method/fungsi."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                mulai = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe('span_seconds', time.perf_counter() - mulai, span=name)
+            return wrapper
+        return decorator
+
+    def register_cache(self, name, stats_fn):
+        """Daftarkan sumber statistik cache (mis. LRUCache.stats). Nama sama akan diganti."""
+        with self._lock:
+            self._caches[name] = stats_fn
+
+    def unregister_cache(self, name):
+        with self._lock:
+            self._caches.pop(name, None)
+
+    def unregister_labels(self, **labels):
+        """Hapus semua histogram yang labelnya memuat `labels` (mis. konteks dataset yang dilepas)."""
+        cari = set(labels.items())
+        with self._lock:
+            for key in [k for k in self._histograms if cari <= set(k[1])]:
+                del self._histograms[key]
+
+    def snapshot(self):
+        with self._lock:
+            histograms = list(self._histograms.items())
+            caches = list(self._caches.items())
+        hist = [
+            {
+                'metric': metric,
+                'labels': dict(labels),
+                'count': h.count,
+                'sum': h.sum,
+                'quantiles': h.quantiles(),
+            }
+            for (metric, labels), h in histograms
+        ]
+        return {
+            'histograms': sorted(hist, key=lambda h: (h['metric'], sorted(h['labels'].items()))),
+            'caches': {name: fn() for name, fn in caches},
+        }
+
+    def prometheus(self, prefix='milk'):
+        """Format teks eksposisi Prometheus (summary untuk latensi, counter/gauge untuk cache)."""
+        snap = self.snapshot()
+        lines = []
+        seen = set()
+        for h in snap['histograms']:
+            name = f"{prefix}_{h['metric']}"
+            if name not in seen:
+                lines.append(f"# TYPE {name} summary")
+                seen.add(name)
+            labels = ','.join(f'{k}="{_escape(v)}"' for k, v in sorted(h['labels'].items()))
+            for q, v in h['quantiles'].items():
+                sep = ',' if labels else ''
+                lines.append(f'{name}{{{labels}{sep}quantile="{q}"}} {v:.6f}')
+            suffix = f'{{{labels}}}' if labels else ''
+            lines.append(f"{name}_sum{suffix} {h['sum']:.6f}")
+            lines.append(f"{name}_count{suffix} {h['count']}")
+
+        cache_metrics = [
+            ('cache_hits_total', 'counter', 'hits'),
+            ('cache_misses_total', 'counter', 'misses'),
+            ('cache_evictions_total', 'counter', 'evictions'),
+            ('cache_hit_ratio', 'gauge', 'hit_ratio'),
+            ('cache_size', 'gauge', 'size'),
+        ]
+        for metric, kind, field in cache_metrics:
+            rows = [(n, s[field]) for n, s in snap['caches'].items() if field in s]
+            if not rows:
+                continue
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            for n, v in rows:
+                lines.append(f'{prefix}_{metric}{{cache="{_escape(n)}"}} {v}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics(enabled=Config.METRICS_ENABLED)
@@ -1,4 +1,19 @@
 import pandas as pd
+from utils.schema import NUMERIC_COLS, normalize_columns, resolve_columns, missing_columns
+
+
+def fill_produksi_harian(df):
+    """Buat produksi_susu_per_hari_liter dari pagi + sore bila belum ada. Mengembalikan True jika dibuat."""
+    if 'produksi_susu_per_hari_liter' in df.columns:
+        return False
+    if ('produksi_susu_pagi_liter' not in df.columns) or ('produksi_susu_sore_liter' not in df.columns):
+        return False
+    # pastikan numeric lalu jumlahkan
+    df['produksi_susu_pagi_liter'] = pd.to_numeric(df['produksi_susu_pagi_liter'], errors='coerce')
+    df['produksi_susu_sore_liter'] = pd.to_numeric(df['produksi_susu_sore_liter'], errors='coerce')
+    df['produksi_susu_per_hari_liter'] = df['produksi_susu_pagi_liter'].fillna(0) + df['produksi_susu_sore_liter'].fillna(0)
+    return True
+
 
 def preprocess_data(df):
     """
@@ -11,71 +26,18 @@ def preprocess_data(df):
 
     # --- 1) Normalisasi nama kolom (robust) ---
     original_cols = list(df.columns)
-    cols = (
-        df.columns
-          .astype(str)
-          .str.strip()
-          .str.lower()
-          # penting: ganti slash (/) dengan _per_ supaya 'susu/hari' -> 'susu_per_hari'
-          .str.replace('/', '_per_', regex=False)
-          .str.replace(r'[-–—]', '_', regex=True)        # hyphen -> underscore
-          .str.replace(r'[()\[\],%]', '', regex=True)   # hapus tanda kurung, bracket, koma, persen
-          .str.replace(r'\s+', '_', regex=True)         # spasi -> underscore
-          .str.replace(r'__+', '_', regex=True)         # collapse double underscore
-          .str.strip('_')
-    )
-    df.columns = cols
     steps_log.append("1) Normalisasi nama kolom (lowercase, spasi->_, '/'->_per_, hapus simbol).")
     steps_log.append(f"   Sebelumnya: {original_cols}")
-    steps_log.append(f"   Sekarang  : {list(df.columns)}")
-
-    # --- 2) Mapping alias ke nama baku (tambah alias jika perlu) ---
-    col_map = {
-        # identitas penting
-        'kode_sapi': 'kode_sapi',
-        'tanggal_pemerahan': 'tanggal_pemerahan',
-        'tanggal_lahir': 'tanggal_lahir',
-
-        # umur
-        'umur': 'umur_tahun',
-        'umur_(tahun)': 'umur_tahun',
-        'umur_tahun': 'umur_tahun',
-
-        # berat
-        'berat_badan_kg': 'berat_badan_kg',
-        'berat_badan': 'berat_badan_kg',
-        'berat': 'berat_badan_kg',
-
-        # pakan
-        'jumlah_pakan_kg': 'jumlah_pakan_kg',
-        'jumlah_pakan': 'jumlah_pakan_kg',
-        'pakan': 'jumlah_pakan_kg',
-
-        # suhu
-        'rata_rata_suhu': 'rata_rata_suhu',
-        'rata-rata_suhu': 'rata_rata_suhu',
-        'suhu': 'rata_rata_suhu',
-
-        # produksi (beberapa variasi)
-        'produksi_susu_per_hari_liter': 'produksi_susu_per_hari_liter',
-        'produksi_susu_hari_liter': 'produksi_susu_per_hari_liter',
-        'produksi_susuhari_liter': 'produksi_susu_per_hari_liter',
-        'produksi_susu': 'produksi_susu_per_hari_liter',
-        # produksi pagi/sore (untuk fallback)
-        'produksi_susu_pagi_liter': 'produksi_susu_pagi_liter',
-        'produksi_susu_sore_liter': 'produksi_susu_sore_liter',
-    }
-    df = df.rename(columns={c: col_map.get(c, c) for c in df.columns})
+    steps_log.append(f"   Sekarang  : {normalize_columns(original_cols)}")
+
+    # --- 2) Mapping alias ke nama baku (COL_MAP di utils.schema) ---
+    df.columns = resolve_columns(original_cols)
     steps_log.append("2) Mapping alias kolom ke nama baku (jika ada).")
     steps_log.append(f"   Nama kolom setelah mapping: {list(df.columns)}")
 
     # --- 3) Fallback: buat produksi_per_hari jika tidak ada tapi pagi+sore ada ---
     if 'produksi_susu_per_hari_liter' not in df.columns:
-        if ('produksi_susu_pagi_liter' in df.columns) and ('produksi_susu_sore_liter' in df.columns):
-            # pastikan numeric lalu jumlahkan
-            df['produksi_susu_pagi_liter'] = pd.to_numeric(df['produksi_susu_pagi_liter'], errors='coerce')
-            df['produksi_susu_sore_liter'] = pd.to_numeric(df['produksi_susu_sore_liter'], errors='coerce')
-            df['produksi_susu_per_hari_liter'] = df['produksi_susu_pagi_liter'].fillna(0) + df['produksi_susu_sore_liter'].fillna(0)
+        if fill_produksi_harian(df):
             steps_log.append("3) Kolom 'produksi_susu_per_hari_liter' dibuat dari (pagi + sore).")
         else:
             # tidak bisa fallback — akan diperiksa di cek wajib
@@ -86,7 +48,7 @@ def preprocess_data(df):
         'kode_sapi', 'tanggal_pemerahan', 'tanggal_lahir', 'umur_tahun',
         'berat_badan_kg', 'jumlah_pakan_kg', 'rata_rata_suhu', 'produksi_susu_per_hari_liter'
     ]
-    missing = [c for c in required_cols if c not in df.columns]
+    missing = missing_columns(df.columns, required_cols)
     if missing:
         # tampilkan kolom yang tersedia untuk debugging
         available = list(df.columns)
@@ -114,7 +76,7 @@ def preprocess_data(df):
         steps_log.append("7) Umur lengkap, tidak perlu dihitung ulang.")
 
     # --- 8) Konversi kolom numerik & hapus baris kosong pada wajib ---
-    numeric_cols = ['umur_tahun', 'berat_badan_kg', 'jumlah_pakan_kg', 'rata_rata_suhu', 'produksi_susu_per_hari_liter']
+    numeric_cols = NUMERIC_COLS
     for c in numeric_cols:
         df[c] = pd.to_numeric(df[c], errors='coerce')
 
@@ -123,23 +85,22 @@ def preprocess_data(df):
     steps_log.append(f"8) Dihapus {before - len(df)} baris karena nilai kosong pada kolom wajib.")
 
     # --- 9) Deteksi outlier (IQR) dan ganti dengan mean; buat highlight mask ---
-    highlight_mask = pd.DataFrame(False, index=df.index, columns=numeric_cols)
+    # semua kolom sekaligus: satu panggilan quantile, mask dibandingkan per kolom
+    values = df[numeric_cols].astype(float)
+    q = values.quantile([0.25, 0.75])
+    iqr = q.loc[0.75] - q.loc[0.25]
+    lower = q.loc[0.25] - 1.5 * iqr
+    upper = q.loc[0.75] + 1.5 * iqr
+    means = values.mean()
+    highlight_mask = values.lt(lower, axis=1) | values.gt(upper, axis=1)
+    df[numeric_cols] = values.mask(highlight_mask, means, axis=1)
+    counts = highlight_mask.sum()
     for col in numeric_cols:
-        if df[col].empty:
-            continue
-        Q1 = df[col].quantile(0.25)
-        Q3 = df[col].quantile(0.75)
-        IQR = Q3 - Q1
-        lower = Q1 - 1.5 * IQR
-        upper = Q3 + 1.5 * IQR
-        mean_val = df[col].mean()
-        mask = (df[col] < lower) | (df[col] > upper)
-        highlight_mask[col] = mask
-        df.loc[mask, col] = mean_val
-        steps_log.append(f"9) {mask.sum()} outlier di '{col}' diganti dengan rata-rata ({mean_val:.2f}).")
+        steps_log.append(f"9) {counts[col]} outlier di '{col}' diganti dengan rata-rata ({means[col]:.2f}).")
 
     # --- 10) Reset index dan selesai ---
     df = df.reset_index(drop=True)
+    highlight_mask = highlight_mask.reset_index(drop=True)
     steps_log.append("10) Reset index selesai.")
 
     return df, highlight_mask, steps_log
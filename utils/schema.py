@@ -0,0 +1,111 @@
+import re
+from functools import lru_cache
+
+# Mapping alias ke nama baku (tambah alias jika perlu)
+COL_MAP = {
+    # identitas penting
+    'kode_sapi': 'kode_sapi',
+    'tanggal_pemerahan': 'tanggal_pemerahan',
+    'tanggal_lahir': 'tanggal_lahir',
+
+    # umur
+    'umur': 'umur_tahun',
+    'umur_(tahun)': 'umur_tahun',
+    'umur_tahun': 'umur_tahun',
+
+    # berat
+    'berat_badan_kg': 'berat_badan_kg',
+    'berat_badan': 'berat_badan_kg',
+    'berat': 'berat_badan_kg',
+
+    # pakan
+    'jumlah_pakan_kg': 'jumlah_pakan_kg',
+    'jumlah_pakan': 'jumlah_pakan_kg',
+    'pakan': 'jumlah_pakan_kg',
+
+    # suhu
+    'rata_rata_suhu': 'rata_rata_suhu',
+    'rata-rata_suhu': 'rata_rata_suhu',
+    'suhu': 'rata_rata_suhu',
+
+    # produksi (beberapa variasi)
+    'produksi_susu_per_hari_liter': 'produksi_susu_per_hari_liter',
+    'produksi_susu_hari_liter': 'produksi_susu_per_hari_liter',
+    'produksi_susuhari_liter': 'produksi_susu_per_hari_liter',
+    'produksi_susu': 'produksi_susu_per_hari_liter',
+    # produksi pagi/sore (untuk fallback)
+    'produksi_susu_pagi_liter': 'produksi_susu_pagi_liter',
+    'produksi_susu_sore_liter': 'produksi_susu_sore_liter',
+}
+
+NUMERIC_COLS = ['umur_tahun', 'berat_badan_kg', 'jumlah_pakan_kg', 'rata_rata_suhu', 'produksi_susu_per_hari_liter']
+
+# kolom wajib saat upload (nama baku)
+UPLOAD_REQUIRED_COLS = [
+    'kode_sapi', 'umur_tahun', 'berat_badan_kg',
+    'jumlah_pakan_kg', 'produksi_susu_per_hari_liter',
+    'tanggal_pemerahan'
+]
+
+# regex dikompilasi sekali
+_HYPHEN = re.compile(r'[-–—]')
+_SYMBOLS = re.compile(r'[()\[\],%]')
+_SPACES = re.compile(r'\s+')
+_UNDERSCORES = re.compile(r'__+')
+
+
+class MissingColumnsError(ValueError):
+    """Kolom wajib tidak ditemukan setelah normalisasi & mapping alias."""
+
+    def __init__(self, missing, available):
+        self.missing = list(missing)
+        self.available = list(available)
+        super().__init__(f"Kolom wajib hilang: {self.missing}. Kolom tersedia: {self.available}")
+
+    def __reduce__(self):
+        # supaya bisa dikirim balik dari process pool (models.jobs)
+        return type(self), (self.missing, self.available)
+
+
+def normalize_header(name):
+    """Normalisasi satu nama kolom (lowercase, spasi->_, '/'->_per_, hapus simbol)."""
+    name = str(name).strip().lower()
+    # penting: ganti slash (/) dengan _per_ supaya 'susu/hari' -> 'susu_per_hari'
+    name = name.replace('/', '_per_')
+    name = _HYPHEN.sub('_', name)          # hyphen -> underscore
+    name = _SYMBOLS.sub('', name)          # hapus tanda kurung, bracket, koma, persen
+    name = _SPACES.sub('_', name)          # spasi -> underscore
+    name = _UNDERSCORES.sub('_', name)     # collapse double underscore
+    return name.strip('_')
+
+
+@lru_cache(maxsize=256)
+def _normalize_header_tuple(header):
+    return tuple(normalize_header(c) for c in header)
+
+
+@lru_cache(maxsize=256)
+def _resolve_header_tuple(header):
+    return tuple(COL_MAP.get(c, c) for c in _normalize_header_tuple(header))
+
+
+def normalize_columns(columns):
+    """Nama kolom yang sudah dinormalisasi (tanpa mapping alias), memoized per header."""
+    return list(_normalize_header_tuple(tuple(map(str, columns))))
+
+
+def resolve_columns(columns):
+    """Nama kolom baku (normalisasi + mapping alias COL_MAP), memoized per header."""
+    return list(_resolve_header_tuple(tuple(map(str, columns))))
+
+
+def missing_columns(columns, required=UPLOAD_REQUIRED_COLS):
+    """Kolom wajib yang tidak ada. `columns` harus sudah berupa nama baku."""
+    present = set(columns)
+    return [c for c in required if c not in present]
+
+
+def validate_columns(columns, required=UPLOAD_REQUIRED_COLS):
+    missing = missing_columns(columns, required)
+    if missing:
+        raise MissingColumnsError(missing, columns)
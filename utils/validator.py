@@ -1,63 +1,126 @@
+import numpy as np
+
+# Aturan rekomendasi berbasis tabel. Tiap aspek dinilai untuk seluruh kolom sekaligus
+# (np.select atas batas yang sudah dikompilasi) dan menghasilkan kode pendek; teks baru
+# dibentuk dari TEKS_REKOMENDASI saat ditampilkan. Riwayat cukup menyimpan kodenya.
+#
+# Format band: (operator, batas, kode, teks); band terakhir (None, None, ...) = sisanya.
+
+SUHU_BANDS = [
+    ('<', 20, 'S0', "🌡️ Suhu lingkungan terlalu dingin (< 20°C). Tambahkan jerami untuk insulasi dan tutup celah angin agar sapi tetap hangat dan tidak stres."),
+    ('<=', 25, 'S1', "🌡️ Suhu lingkungan ideal (20°C – 25°C). Pertahankan kondisi ini untuk kenyamanan dan produksi susu yang optimal."),
+    ('<=', 28, 'S2', "🌡️ Suhu lingkungan cukup panas (> 25°C – 28°C). Tingkatkan ventilasi dan siram lantai serta tubuh sapi 2 kali sehari (pagi & siang) untuk menjaga suhu tubuh."),
+    ('<=', 31, 'S3', "🌡️ Suhu lingkungan panas (> 28°C – 31°C). Siram lantai dan tubuh sapi 3 kali sehari (pagi, siang, sore) dan pastikan ventilasi maksimal."),
+    ('<=', 34, 'S4', "🌡️ Suhu lingkungan sangat panas (> 31°C – 34°C). Siram lantai dan tubuh sapi 4 kali sehari (pagi, siang, sore, malam) dan tingkatkan ventilasi."),
+    (None, None, 'S5', "🌡️ Suhu lingkungan ekstrem (> 34°C). Siram lantai dan tubuh sapi setiap 2–3 jam, terutama siang hari, dan pastikan ventilasi terbuka maksimal untuk menghindari stres panas."),
+]
+
+# kelompok umur untuk aturan pakan: (operator, batas umur, pakan minimal, pakan maksimal, kode/teks)
+# kode/teks per kelompok: (kurang, lebih, pas); kelompok tanpa batas pakan memakai satu kode saja
+PAKAN_BANDS = [
+    ('<', 1, None, None, [
+        ('P0', "🥬 Sapi masih terlalu muda, belum siap untuk produksi susu."),
+    ]),
+    ('<', 2, 20, 25, [
+        ('P1', "🥬 Tambah jumlah pakan. Usia 1–2 tahun butuh minimal 20 kg pakan per hari."),
+        ('P2', "🥬 Kurangi sedikit pakan. Untuk usia 1–2 tahun, maksimal 25 kg per hari sudah cukup."),
+        ('P3', "🥬 Jumlah pakan sudah pas untuk usia 1–2 tahun."),
+    ]),
+    ('<=', 4, 30, 40, [
+        ('P4', "🥬 Tambah pakan. Usia 2–4 tahun butuh minimal 30 kg per hari."),
+        ('P5', "🥬 Pakan terlalu banyak. Cukup 30–40 kg per hari untuk usia ini."),
+        ('P6', "🥬 Pemberian pakan sudah tepat untuk usia 2–4 tahun."),
+    ]),
+    (None, None, 30, 40, [
+        ('P7', "🥬 Untuk sapi dewasa, tambahkan pakan minimal 30 kg per hari."),
+        ('P8', "🥬 Kurangi sedikit pakan. 30–40 kg per hari cukup untuk sapi dewasa."),
+        ('P9', "🥬 Jumlah pakan sudah sesuai untuk sapi dewasa."),
+    ]),
+]
+
+UMUR_BANDS = [
+    ('<', 2, 'U0', "🐮 Sapi masih terlalu muda untuk produksi susu. Umumnya mulai produktif setelah usia 2 tahun."),
+    ('<', 3, 'U1', "🐮 Sapi baru mulai masa produksi. Jaga kondisi tubuh agar produksi stabil."),
+    ('<=', 5, 'U2', "🐮 Sapi berada di masa produksi puncak. Pertahankan kualitas pakan dan perawatan."),
+    ('<=', 8, 'U3', "🐮 Sapi mulai memasuki masa tua. Produksi bisa menurun, pastikan kesehatannya terjaga."),
+    (None, None, 'U4', "🐮 Sapi sudah tua. Produksi susu cenderung rendah, perhatikan pola makan dan kesehatan."),
+]
+
+BERAT_BANDS = [
+    ('<', 350, 'B0', "⚖️ Berat badan terlalu ringan. Tingkatkan nutrisi pakan agar berat ideal."),
+    ('<=', 600, 'B1', "⚖️ Berat badan sapi sudah ideal, pertahankan pola makan dan perawatan."),
+    (None, None, 'B2', "⚖️ Berat badan terlalu berat. Kontrol pakan agar tidak obesitas."),
+]
+
+# teks versi sebelumnya (rentang suhu lama) -> kode, untuk migrasi riwayat yang tersimpan sebagai teks
+TEKS_LAMA = {
+    "🌡️ Suhu lingkungan cukup panas (26°C – 28°C). Tingkatkan ventilasi dan siram lantai serta tubuh sapi 2 kali sehari (pagi & siang) untuk menjaga suhu tubuh.": 'S2',
+    "🌡️ Suhu lingkungan panas (29°C – 31°C). Siram lantai dan tubuh sapi 3 kali sehari (pagi, siang, sore) dan pastikan ventilasi maksimal.": 'S3',
+    "🌡️ Suhu lingkungan sangat panas (32°C – 34°C). Siram lantai dan tubuh sapi 4 kali sehari (pagi, siang, sore, malam) dan tingkatkan ventilasi.": 'S4',
+}
+
+_OPS = {'<': np.less, '<=': np.less_equal}
+
+
+def _compile(bands):
+    """Band -> ([(ufunc, batas), ...], array kode); indeks terakhir = band sisa."""
+    tests = [(_OPS[op], batas) for op, batas, *_ in bands[:-1]]
+    return tests, np.array([b[2] for b in bands])
+
+
+def _band_index(x, tests):
+    return np.select([op(x, batas) for op, batas in tests], np.arange(len(tests)), len(tests))
+
+
+_SUHU = _compile(SUHU_BANDS)
+_UMUR = _compile(UMUR_BANDS)
+_BERAT = _compile(BERAT_BANDS)
+_PAKAN_GRUP = [(_OPS[op], batas) for op, batas, *_ in PAKAN_BANDS[:-1]]
+_PAKAN_MIN = np.array([-np.inf if b[2] is None else b[2] for b in PAKAN_BANDS], dtype=float)
+_PAKAN_MAX = np.array([np.inf if b[3] is None else b[3] for b in PAKAN_BANDS], dtype=float)
+# (kelompok umur, kurang/lebih/pas) -> kode
+_PAKAN_KODE = np.array([[k for k, _ in b[4]] * (3 // len(b[4])) for b in PAKAN_BANDS])
+
+TEKS_REKOMENDASI = {
+    kode: teks
+    for kode, teks in [b[2:4] for b in SUHU_BANDS + UMUR_BANDS + BERAT_BANDS]
+    + [kt for b in PAKAN_BANDS for kt in b[4]]
+}
+KODE_DARI_TEKS = {**{t: k for k, t in TEKS_REKOMENDASI.items()}, **TEKS_LAMA}
+
+
+def kode_rekomendasi(umur, berat, pakan, suhu):
+    """
+    Kode rekomendasi untuk banyak baris sekaligus. Argumen berupa kolom (array/Series/list)
+    sepanjang n; hasil array (n, 4) berisi kode [suhu, pakan, umur, berat], '' bila nilainya kosong.
+    """
+    umur, berat, pakan, suhu = (np.asarray(v, dtype=float) for v in (umur, berat, pakan, suhu))
+
+    kode_suhu = _SUHU[1][_band_index(suhu, _SUHU[0])]
+    grup = _band_index(umur, _PAKAN_GRUP)
+    level = np.select([pakan < _PAKAN_MIN[grup], pakan > _PAKAN_MAX[grup]], [0, 1], 2)
+    kode_pakan = _PAKAN_KODE[grup, level]
+    kode_umur = _UMUR[1][_band_index(umur, _UMUR[0])]
+    kode_berat = _BERAT[1][_band_index(berat, _BERAT[0])]
+
+    hasil = np.stack([kode_suhu, kode_pakan, kode_umur, kode_berat], axis=-1)
+    hasil[np.isnan(suhu), 0] = ''
+    hasil[np.isnan(umur) | (np.isnan(pakan) & (grup > 0)), 1] = ''
+    hasil[np.isnan(umur), 2] = ''
+    hasil[np.isnan(berat), 3] = ''
+    return hasil
+
+
+def teks_rekomendasi(kode):
+    """Kode -> teks untuk ditampilkan; nilai yang bukan kode (teks bebas lama) dikembalikan apa adanya."""
+    return [TEKS_REKOMENDASI.get(k, k) for k in kode if k]
+
+
+def ke_kode(rekomendasi):
+    """List teks/kode rekomendasi -> list kode (teks yang tidak dikenal tetap disimpan apa adanya)."""
+    return [KODE_DARI_TEKS.get(r, r) for r in rekomendasi if r]
+
+
 def generate_rekomendasi(umur, berat, pakan, suhu):
-    rekomendasi = []
-
-    # Suhu Lingkungan
-    if suhu < 20:
-        rekomendasi.append("🌡️ Suhu lingkungan terlalu dingin (< 20°C). Tambahkan jerami untuk insulasi dan tutup celah angin agar sapi tetap hangat dan tidak stres.")
-    elif 20 <= suhu <= 25:
-        rekomendasi.append("🌡️ Suhu lingkungan ideal (20°C – 25°C). Pertahankan kondisi ini untuk kenyamanan dan produksi susu yang optimal.")
-    elif 26 <= suhu <= 28:
-        rekomendasi.append("🌡️ Suhu lingkungan cukup panas (26°C – 28°C). Tingkatkan ventilasi dan siram lantai serta tubuh sapi 2 kali sehari (pagi & siang) untuk menjaga suhu tubuh.")
-    elif 29 <= suhu <= 31:
-        rekomendasi.append("🌡️ Suhu lingkungan panas (29°C – 31°C). Siram lantai dan tubuh sapi 3 kali sehari (pagi, siang, sore) dan pastikan ventilasi maksimal.")
-    elif 32 <= suhu <= 34:
-        rekomendasi.append("🌡️ Suhu lingkungan sangat panas (32°C – 34°C). Siram lantai dan tubuh sapi 4 kali sehari (pagi, siang, sore, malam) dan tingkatkan ventilasi.")
-    else:  # suhu > 34
-        rekomendasi.append("🌡️ Suhu lingkungan ekstrem (> 34°C). Siram lantai dan tubuh sapi setiap 2–3 jam, terutama siang hari, dan pastikan ventilasi terbuka maksimal untuk menghindari stres panas.")
-
-    # Umur dan pakan
-    if umur < 1:
-        rekomendasi.append("🥬 Sapi masih terlalu muda, belum siap untuk produksi susu.")
-    elif 1 <= umur < 2:
-        if pakan < 20:
-            rekomendasi.append("🥬 Tambah jumlah pakan. Usia 1–2 tahun butuh minimal 20 kg pakan per hari.")
-        elif pakan > 25:
-            rekomendasi.append("🥬 Kurangi sedikit pakan. Untuk usia 1–2 tahun, maksimal 25 kg per hari sudah cukup.")
-        else:
-            rekomendasi.append("🥬 Jumlah pakan sudah pas untuk usia 1–2 tahun.")
-    elif 2 <= umur <= 4:
-        if pakan < 30:
-            rekomendasi.append("🥬 Tambah pakan. Usia 2–4 tahun butuh minimal 30 kg per hari.")
-        elif pakan > 40:
-            rekomendasi.append("🥬 Pakan terlalu banyak. Cukup 30–40 kg per hari untuk usia ini.")
-        else:
-            rekomendasi.append("🥬 Pemberian pakan sudah tepat untuk usia 2–4 tahun.")
-    else:
-        if pakan < 30:
-            rekomendasi.append("🥬 Untuk sapi dewasa, tambahkan pakan minimal 30 kg per hari.")
-        elif pakan > 40:
-            rekomendasi.append("🥬 Kurangi sedikit pakan. 30–40 kg per hari cukup untuk sapi dewasa.")
-        else:
-            rekomendasi.append("🥬 Jumlah pakan sudah sesuai untuk sapi dewasa.")
-
-    # Umur produktif
-    if umur < 2:
-        rekomendasi.append("🐮 Sapi masih terlalu muda untuk produksi susu. Umumnya mulai produktif setelah usia 2 tahun.")
-    elif 2 <= umur < 3:
-        rekomendasi.append("🐮 Sapi baru mulai masa produksi. Jaga kondisi tubuh agar produksi stabil.")
-    elif 3 <= umur <= 5:
-        rekomendasi.append("🐮 Sapi berada di masa produksi puncak. Pertahankan kualitas pakan dan perawatan.")
-    elif 6 <= umur <= 8:
-        rekomendasi.append("🐮 Sapi mulai memasuki masa tua. Produksi bisa menurun, pastikan kesehatannya terjaga.")
-    else:
-        rekomendasi.append("🐮 Sapi sudah tua. Produksi susu cenderung rendah, perhatikan pola makan dan kesehatan.")
-
-    # Berat badan
-    if berat < 350:
-        rekomendasi.append("⚖️ Berat badan terlalu ringan. Tingkatkan nutrisi pakan agar berat ideal.")
-    elif berat > 600:
-        rekomendasi.append("⚖️ Berat badan terlalu berat. Kontrol pakan agar tidak obesitas.")
-    else:
-        rekomendasi.append("⚖️ Berat badan sapi sudah ideal, pertahankan pola makan dan perawatan.")
-
-    return rekomendasi
+    """Teks rekomendasi untuk satu sapi (pembungkus kode_rekomendasi)."""
+    return teks_rekomendasi(kode_rekomendasi([umur], [berat], [pakan], [suhu])[0])